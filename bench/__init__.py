@@ -0,0 +1,6 @@
+import os
+import sys
+
+src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
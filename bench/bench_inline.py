@@ -0,0 +1,34 @@
+import timeit
+
+import bench
+from conversion import text_to_textnodes, split_nodes_image, split_nodes_link, split_nodes_delimiter
+from textnode import TextNode
+
+
+def chained_text_to_textnodes(text):
+    nodes = split_nodes_link(split_nodes_image([TextNode(text, "text")]))
+    for delimiter in ["**", "*", "`"]:
+        nodes = split_nodes_delimiter(nodes, delimiter)
+    return nodes
+
+def link_dense_paragraph(links):
+    parts = []
+    for i in range(links):
+        parts.append(f"see [page {i}](/pages/{i}) and **bold {i}** then ")
+        if i % 5 == 0:
+            parts.append(f"![figure {i}](/images/{i}.png) with `code {i}` ")
+    return "".join(parts)
+
+def main():
+    print(f"{'links':>8} {'chained ms':>12} {'single ms':>12} {'speedup':>8}")
+    for links in [10, 100, 1000, 5000]:
+        text = link_dense_paragraph(links)
+        if chained_text_to_textnodes(text) != text_to_textnodes(text):
+            raise Exception(f"Outputs differ for {links} links")
+        number = max(1, 2000 // links)
+        chained = min(timeit.repeat(lambda: chained_text_to_textnodes(text), number=number, repeat=3)) / number
+        single = min(timeit.repeat(lambda: text_to_textnodes(text), number=number, repeat=3)) / number
+        print(f"{links:>8} {chained * 1000:>12.3f} {single * 1000:>12.3f} {chained / single:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import gc
+import time
+import tracemalloc
+
+import bench
+from bench.corpus import CorpusGenerator
+from conversion import markdown_to_html_node, clear_inline_cache
+
+
+def measure(markdown):
+    clear_inline_cache()
+    gc.collect()
+    collections = sum(stat["collections"] for stat in gc.get_stats())
+    tracemalloc.start()
+    start = time.perf_counter()
+    tree = markdown_to_html_node(markdown)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    collections = sum(stat["collections"] for stat in gc.get_stats()) - collections
+    return tree, peak, collections, elapsed
+
+def main():
+    generator = CorpusGenerator(seed=0, blocks_per_page=5000)
+    markdown = generator.page("Large document")
+    tree, peak, collections, elapsed = measure(markdown)
+    print(f"{len(markdown) / 1e6:.2f} MB markdown -> peak {peak / 1e6:.1f} MB traced, "
+          f"{collections} gc collections, {elapsed:.2f} s (under tracemalloc)")
+
+if __name__ == "__main__":
+    main()
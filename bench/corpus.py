@@ -0,0 +1,82 @@
+import os
+import random
+
+default_block_mix = {"paragraph": 6, "heading": 2, "ulist": 2, "olist": 1, "quote": 1, "code": 1}
+
+words = ("the quick brown fox jumps over lazy dog ring hobbit wizard elf dwarf mountain "
+         "river forest shire road journey tower king return fellowship council").split()
+
+
+class CorpusGenerator:
+    def __init__(self, seed=0, block_mix=None, link_density=0.05, emphasis_density=0.08,
+                 blocks_per_page=20, words_per_block=40):
+        self.random = random.Random(seed)
+        self.block_mix = block_mix or default_block_mix
+        self.link_density = link_density
+        self.emphasis_density = emphasis_density
+        self.blocks_per_page = blocks_per_page
+        self.words_per_block = words_per_block
+
+    def inline_text(self, count):
+        parts = []
+        for _ in range(count):
+            word = self.random.choice(words)
+            roll = self.random.random()
+            if roll < self.link_density:
+                parts.append(f"[{word}](/{self.random.choice(words)}/{self.random.randint(0, 999)})")
+            elif roll < self.link_density + self.emphasis_density:
+                parts.append(self.random.choice([f"**{word}**", f"*{word}*", f"`{word}`"]))
+            else:
+                parts.append(word)
+        return " ".join(parts)
+
+    def block(self, kind):
+        count = self.words_per_block
+        if kind == "heading":
+            return "#" * self.random.randint(2, 6) + " " + self.inline_text(6)
+        if kind == "ulist":
+            return "\n".join("* " + self.inline_text(count // 5) for _ in range(5))
+        if kind == "olist":
+            return "\n".join(f"{i}. " + self.inline_text(count // 5) for i in range(1, 6))
+        if kind == "quote":
+            return "\n".join("> " + self.inline_text(count // 3) for _ in range(3))
+        if kind == "code":
+            return "```\n" + "\n".join(self.inline_text(8) for _ in range(4)) + "\n```"
+        return "\n".join(self.inline_text(count // 2) for _ in range(2))
+
+    def page(self, title):
+        kinds = list(self.block_mix)
+        weights = [self.block_mix[kind] for kind in kinds]
+        blocks = [f"# {title}"]
+        for kind in self.random.choices(kinds, weights, k=self.blocks_per_page):
+            blocks.append(self.block(kind))
+        return "\n\n".join(blocks) + "\n"
+
+def page_dir(index, depth, fanout=10):
+    #Spread pages over nested section directories depth levels deep
+    parts = []
+    value = index
+    for _ in range(depth):
+        parts.append(f"s{value % fanout}")
+        value //= fanout
+    parts.append(f"page{index}")
+    return os.path.join(*parts)
+
+def generate_site(root, pages, depth=2, seed=0, **options):
+    generator = CorpusGenerator(seed, **options)
+    content_dir = os.path.join(root, "content")
+    total_bytes = 0
+
+    for i in range(pages):
+        directory = os.path.join(content_dir, page_dir(i, depth)) if i else content_dir
+        os.makedirs(directory, exist_ok=True)
+        markdown = generator.page(f"Page {i}")
+        with open(os.path.join(directory, "index.md"), "w") as file:
+            file.write(markdown)
+        total_bytes += len(markdown.encode())
+
+    template_path = os.path.join(root, "template.html")
+    with open(template_path, "w") as file:
+        file.write("<html><head><title>{{ Title }}</title></head><body>{{ Content }}</body></html>")
+
+    return content_dir, template_path, total_bytes
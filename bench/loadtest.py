@@ -0,0 +1,103 @@
+import argparse
+import http.client
+import os
+import threading
+import time
+import urllib.parse
+
+import bench
+from server import start_server
+
+
+def site_paths(root):
+    #Every page and asset under root, as the URL paths a browser would request
+    paths = []
+    for directory, _, files in os.walk(root):
+        for name in sorted(files):
+            if name.endswith((".gz", ".br")):
+                continue
+            relative = os.path.relpath(os.path.join(directory, name), root).replace(os.sep, "/")
+            paths.append("/" + (relative[:-len("index.html")] if relative.endswith("index.html") else relative))
+    return sorted(paths)
+
+def client(host, port, paths, requests, headers, latencies, errors):
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    for i in range(requests):
+        start = time.perf_counter()
+        try:
+            connection.request("GET", paths[i % len(paths)], headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=10)
+            continue
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def run(host, port, paths, requests, concurrency, headers):
+    latencies = []
+    errors = []
+    per_client = max(1, requests // concurrency)
+    threads = [threading.Thread(target=client, args=(host, port, paths[i:] + paths[:i], per_client,
+                                                     headers, latencies, errors))
+               for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the static server with keep-alive clients.")
+    parser.add_argument("--url", help="server to test, e.g. http://localhost:8888 (default: start one on --root)")
+    parser.add_argument("--root", default="./public", help="directory to serve and to take request paths from")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--gzip", action="store_true", help="send Accept-Encoding: br, gzip")
+    parser.add_argument("--revalidate", action="store_true",
+                        help="send If-None-Match so every response is a 304")
+    args = parser.parse_args(argv)
+
+    paths = site_paths(args.root)
+    if not paths:
+        parser.error(f"no files under {args.root}; build the site first")
+
+    server = None
+    if args.url:
+        url = urllib.parse.urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        server = start_server(args.root, 0, host="127.0.0.1")
+        host, port = server.server_address[:2]
+
+    headers = {"Accept-Encoding": "br, gzip"} if args.gzip else {}
+    if args.revalidate:
+        headers["If-None-Match"] = "*"
+
+    try:
+        run(host, port, paths, len(paths), 1, headers)
+        latencies, errors, elapsed = run(host, port, paths, args.requests, args.concurrency, headers)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    print(f"{len(latencies)} requests over {len(paths)} paths with {args.concurrency} connections "
+          f"in {elapsed:.2f} s")
+    print(f"{len(latencies) / elapsed:.0f} requests/s, p50 {percentile(latencies, 0.5) * 1000:.2f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.2f} ms, {len(errors)} errors")
+    if server is not None:
+        print(f"Memory cache: {server.cache.hits} hits, {server.cache.misses} misses")
+
+if __name__ == "__main__":
+    main()
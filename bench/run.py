@@ -0,0 +1,144 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import bench
+from bench.corpus import default_block_mix, generate_site
+from build import find_pages, generate_pages_recursive
+from conversion import markdown_to_blocks, markdown_to_html_node, text_to_textnodes, clear_inline_cache, \
+                       block_to_block_type, block_to_html_node
+
+results_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(","):
+        kind, weight = item.split("=")
+        if kind not in default_block_mix:
+            raise argparse.ArgumentTypeError(f"Unknown block type {kind}")
+        mix[kind] = float(weight)
+    return mix
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the site generator on a synthetic corpus.")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--depth", type=int, default=2, help="section directory nesting depth")
+    parser.add_argument("--blocks", type=int, default=20, help="blocks per page")
+    parser.add_argument("--mix", type=parse_mix, default=None,
+                        help="block mix, e.g. paragraph=6,heading=2,ulist=2,olist=1,quote=1,code=1")
+    parser.add_argument("--link-density", type=float, default=0.05)
+    parser.add_argument("--emphasis-density", type=float, default=0.08)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="keep the best of N runs")
+    parser.add_argument("--jobs", type=int, default=1, help="worker processes for the full build")
+    parser.add_argument("--save", nargs="?", const="", metavar="PATH",
+                        help="save results as JSON (default bench/results/<commit>.json)")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved results file")
+    return parser.parse_args(argv)
+
+def best_time(function, repeat):
+    best = None
+    for _ in range(repeat):
+        clear_inline_cache()
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def run(args, root):
+    options = {"blocks_per_page": args.blocks,
+               "link_density": args.link_density,
+               "emphasis_density": args.emphasis_density}
+    if args.mix:
+        options["block_mix"] = args.mix
+    content_dir, template_path, total_bytes = generate_site(root, args.pages, args.depth, args.seed, **options)
+
+    documents = []
+    for from_path, _ in find_pages(content_dir, os.path.join(root, "public")):
+        with open(from_path, "r") as file:
+            documents.append(file.read())
+    blocks = [block for document in documents for block in markdown_to_blocks(document)]
+    trees = [markdown_to_html_node(document) for document in documents]
+    output_dir = os.path.join(root, "public")
+
+    def full_build():
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(content_dir, template_path, output_dir, args.jobs)
+
+    benchmarks = {
+        "markdown_to_blocks": lambda: [markdown_to_blocks(document) for document in documents],
+        "block_to_block_type": lambda: [block_to_block_type(block) for block in blocks],
+        "block_to_html_node": lambda: [block_to_html_node(block) for block in blocks],
+        "text_to_textnodes": lambda: [text_to_textnodes(block) for block in blocks],
+        "markdown_to_html_node": lambda: [markdown_to_html_node(document) for document in documents],
+        "to_html": lambda: [tree.to_html() for tree in trees],
+        "generate_pages_recursive": full_build,
+    }
+
+    results = {}
+    for name, function in benchmarks.items():
+        seconds = best_time(function, args.repeat)
+        results[name] = {"seconds": seconds,
+                         "pages_per_s": len(documents) / seconds,
+                         "mb_per_s": total_bytes / seconds / 1e6}
+    return {"commit": current_commit(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "params": {"pages": args.pages, "depth": args.depth, "blocks": args.blocks,
+                       "mix": args.mix or default_block_mix, "link_density": args.link_density,
+                       "emphasis_density": args.emphasis_density, "seed": args.seed,
+                       "jobs": args.jobs, "bytes": total_bytes},
+            "results": results}
+
+def report(data, baseline=None):
+    print(f"commit {data['commit']}, {data['params']['pages']} pages, {data['params']['bytes'] / 1e6:.2f} MB")
+    header = f"{'benchmark':<26} {'seconds':>9} {'pages/s':>10} {'MB/s':>8}"
+    if baseline:
+        header += f" {'vs ' + baseline['commit']:>14}"
+    print(header)
+    for name, result in data["results"].items():
+        line = f"{name:<26} {result['seconds']:>9.4f} {result['pages_per_s']:>10.1f} {result['mb_per_s']:>8.2f}"
+        if baseline and name in baseline["results"]:
+            change = result["seconds"] / baseline["results"][name]["seconds"] - 1
+            line += f" {change:>+13.1%}"
+        print(line)
+
+def main(argv=None):
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory() as root:
+        data = run(args, root)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r") as file:
+            baseline = json.load(file)
+        if baseline["params"] != data["params"]:
+            print("warning: baseline was recorded with different parameters", file=sys.stderr)
+    report(data, baseline)
+
+    if args.save is not None:
+        path = args.save or os.path.join(results_dir, f"{data['commit']}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(data, file, indent=1, sort_keys=True)
+        print(f"Results saved to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+import itertools
+import os
+import logging
+from conversion import *
+from htmlnode import *
+from textnode import *
+from manifest import hash_file, load_manifest
+from template import compile_template, load_template, render_template, write_template
+from sync import sync_tree, prune_tree
+from cache import active_cache, add_worker_counts, cache_counts, enable_cache, flush_cache, parse_cache_settings
+from profiler import phase, page_phase, profiling
+from writer import save_json, write_output
+from fingerprint import assets_digest, enable_fingerprints, fingerprint_map
+from frontmatter import body_lines, is_draft, read_page_header, split_front_matter
+from concurrent.futures import ProcessPoolExecutor
+
+#Markdown files larger than this are rendered block by block straight from disk
+stream_threshold = 8 * 1024 * 1024
+#Pages with "draft: true" in their front matter are left out unless this is set
+include_drafts = True
+
+
+def copy_files_recursive(source_dir_path, dest_dir_path, checksum=False, hardlink=False):
+    return sync_tree(source_dir_path, dest_dir_path, checksum, hardlink)
+
+def extract_title(markdown):
+    blocks = markdown.split("\n")
+
+    for block in blocks:
+        if block.startswith("# "):
+            return block.lstrip("# ")
+    raise Exception("No header provided")
+
+def read_title(from_path):
+    with open(from_path, "r") as file:
+        values, lines = body_lines(file)
+        if "title" in values:
+            return values["title"]
+        for line in lines:
+            if line.startswith("# "):
+                return line.rstrip("\n").lstrip("# ")
+    raise Exception("No header provided")
+
+def set_include_drafts(include):
+    global include_drafts
+    include_drafts = include
+
+def is_published(from_path):
+    #Decided from the front matter alone; a draft's body is never read
+    if include_drafts:
+        return True
+    try:
+        return not is_draft(read_page_header(from_path))
+    except ValueError:
+        #Broken front matter is reported when the page is generated
+        return True
+
+class MarkdownFile:
+    def __init__(self, path):
+        self.path = path
+
+    def iter_html(self):
+        with open(self.path, "r") as file:
+            yield from iter_markdown_html(body_lines(file)[1])
+
+    def write_html(self, file):
+        file.writelines(self.iter_html())
+
+    def to_html(self):
+        return "".join(self.iter_html())
+
+def generate_page(from_path, template_path, target_path):
+    print(f"Generating page from {from_path} to {target_path} using {template_path}")
+    logging.info(f"Generating page from {from_path} to {target_path} using {template_path}")
+
+    with page_phase(from_path):
+        streamed = os.path.getsize(from_path) > stream_threshold
+        with phase("read"):
+            if not streamed:
+                with open(from_path, "r") as file:
+                    md_contents = file.read()
+
+            template = load_template(template_path)
+
+        if streamed:
+            title = read_title(from_path)
+            content = MarkdownFile(from_path)
+        else:
+            content, title = render_markdown(md_contents)
+
+        #Workers rendering a page below this one may create the directory at the same moment
+        os.makedirs(target_path, exist_ok=True)
+
+        full_path = os.path.join(target_path, "index.html")
+
+        if not profiling():
+            return write_output(full_path, lambda f: write_template(f, template, {"Title": title,
+                                                                                  "Content": content}))
+
+        #Serialize, fill and write one after another so each phase gets its own timing
+        with phase("to_html"):
+            if not isinstance(content, str):
+                content = content.to_html()
+        with phase("template fill"):
+            final = render_template(template, {"Title": title, "Content": content})
+        with phase("write"):
+            return write_output(full_path, lambda f: f.write(final))
+
+def render_markdown(md_contents):
+    #Returns the page body (an HTML node, or a string from the parse cache) and its title
+    cache = active_cache()
+    cached = cache.get(md_contents) if cache is not None else None
+    if cached is not None:
+        return cached
+
+    content, title = parse_markdown(md_contents, cache is not None)
+    if cache is not None:
+        cache.put(md_contents, content, title)
+    return content, title
+
+def parse_markdown(md_contents, serialize=False):
+    #The uncached half of render_markdown; serialize returns the body as a string for the parse cache
+    #A title in the front matter saves scanning the body for the first heading
+    values, body = split_front_matter(md_contents)
+    content = markdown_to_html_node(body)
+    title = values["title"] if "title" in values else extract_title(body)
+    if serialize:
+        with phase("to_html"):
+            content = content.to_html()
+    return content, title
+
+def fill_template(html_string, title, template):
+    return render_template(compile_template(template), {"Title": title, "Content": html_string})
+
+def find_pages(dir_path_content, dest_dir_path):
+    pages = []
+    if os.path.isdir(dir_path_content):
+        for item in sorted(os.listdir(dir_path_content)):
+            new_path_content = os.path.join(dir_path_content, item)
+            new_path_dest = os.path.join(dest_dir_path, item)
+            pages.extend(find_pages(new_path_content, new_path_dest))
+    elif os.path.isfile(dir_path_content):
+        if is_published(dir_path_content):
+            pages.append((dir_path_content, os.path.dirname(dest_dir_path)))
+    return pages
+
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, jobs=1, pipelined=False):
+    return generate_pages(find_pages(dir_path_content, dest_dir_path), template_path, jobs, pipelined=pipelined)
+
+def page_units(pages):
+    #Pages sharing a target directory stay in one unit so the last one still wins
+    units = {}
+    for from_path, dest_path in pages:
+        units.setdefault(dest_path, []).append((from_path, dest_path))
+    return list(units.values())
+
+def count_statuses(statuses):
+    counts = {"written": 0, "skipped": 0}
+    for status in statuses:
+        counts[status] += 1
+    return counts
+
+def generate_pages(pages, template_path, jobs=1, chunk_size=None, pipelined=False):
+    if pipelined and pages:
+        #Imported here because the pipeline renders through this module
+        from pipeline import generate_pages_async
+        statuses, failures = generate_pages_async(page_units(pages), template_path)
+        report_failures([(from_path, failures[from_path]) for from_path, _ in pages
+                         if from_path in failures], len(pages))
+        return count_statuses(statuses.values())
+
+    if jobs <= 1 or len(pages) <= 1:
+        statuses = []
+        for from_path, dest_path in pages:
+            statuses.append(generate_page(from_path, template_path, dest_path))
+        return count_statuses(statuses)
+
+    units = page_units(pages)
+    if chunk_size is None:
+        chunk_size = max(1, min(64, len(units) // (jobs * 4)))
+    batches = [units[i:i + chunk_size] for i in range(0, len(units), chunk_size)]
+
+    errors = []
+    statuses = []
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                             initargs=(parse_cache_settings(), fingerprint_map())) as executor:
+        for results, counts in executor.map(generate_page_batch, batches, itertools.repeat(template_path)):
+            add_worker_counts(*counts["parse_cache"])
+            add_worker_inline_counts(*counts["inline_cache"])
+            for from_path, status, error in results:
+                if error is not None:
+                    errors.append((from_path, error))
+                else:
+                    statuses.append(status)
+    report_failures(errors, len(pages))
+    return count_statuses(statuses)
+
+def report_failures(errors, total):
+    for from_path, error in errors:
+        print(f"Failed to generate {from_path}: {error}")
+        logging.error(f"Failed to generate {from_path}: {error}")
+    if errors:
+        raise Exception(f"{len(errors)} of {total} pages failed to generate")
+
+def init_worker(parse_cache, asset_map):
+    #Workers may be spawned rather than forked (forkserver, macOS, Windows) and then would not
+    #inherit module state set in main(), so the parse cache settings and asset map come in here
+    if parse_cache is not None:
+        enable_cache(*parse_cache)
+    if asset_map is not None:
+        enable_fingerprints(asset_map)
+
+def generate_page_batch(batch, template_path):
+    #Returns each page's status and the cache counts this batch added in the worker
+    hits, misses = cache_counts()
+    inline_hits, inline_misses = inline_cache_counts()
+    results = []
+    for unit in batch:
+        for from_path, dest_path in unit:
+            try:
+                results.append((from_path, generate_page(from_path, template_path, dest_path), None))
+            except Exception as e:
+                results.append((from_path, None, f"{type(e).__name__}: {e}"))
+    flush_cache()
+    batch_hits, batch_misses = cache_counts()
+    batch_inline_hits, batch_inline_misses = inline_cache_counts()
+    return results, {"parse_cache": (batch_hits - hits, batch_misses - misses),
+                     "inline_cache": (batch_inline_hits - inline_hits, batch_inline_misses - inline_misses)}
+
+def static_asset_path(url, static_dir):
+    if not url.startswith("/") or url.startswith("//"):
+        return None
+    path = url.split("#")[0].split("?")[0].lstrip("/")
+    return os.path.normpath(os.path.join(static_dir, path))
+
+def page_dependencies(from_path, template_path, static_dir=None):
+    deps = [template_path]
+    if static_dir is not None:
+        #Line by line so huge pages are never held in memory; an image cannot span lines
+        with open(from_path, "r") as file:
+            for line in file:
+                if "![" not in line:
+                    continue
+                for _, url in extract_markdown_images(line):
+                    asset_path = static_asset_path(url, static_dir)
+                    if asset_path is not None:
+                        deps.append(asset_path)
+    return sorted(set(deps))
+
+def dependency_hash(path, hashes):
+    if path not in hashes:
+        hashes[path] = hash_file(path) if os.path.isfile(path) else None
+    return hashes[path]
+
+def page_entry(from_path, dest_path, template_path, static_dir=None, old_entry=None, hashes=None):
+    if hashes is None:
+        hashes = {}
+    source_hash = hash_file(from_path)
+
+    #An unchanged page still references the same assets, so skip re-reading it
+    if (old_entry is not None and old_entry["hash"] == source_hash
+            and template_path in old_entry.get("deps", {})):
+        dep_paths = list(old_entry["deps"])
+    else:
+        dep_paths = page_dependencies(from_path, template_path, static_dir)
+
+    return {"hash": source_hash,
+            "target": dest_path,
+            "output": os.path.join(dest_path, "index.html"),
+            "deps": {path: dependency_hash(path, hashes) for path in dep_paths}}
+
+def page_entries(dir_path_content, dest_dir_path, template_path, static_dir=None, old_pages=None,
+                 pages=None):
+    #pages defaults to every page under dir_path_content; a shard passes its own slice
+    old_pages = old_pages or {}
+    hashes = {}
+    entries = {}
+    if pages is None:
+        pages = find_pages(dir_path_content, dest_dir_path)
+    for from_path, dest_path in pages:
+        entries[from_path] = page_entry(from_path, dest_path, template_path, static_dir,
+                                        old_pages.get(from_path), hashes)
+    return entries
+
+def rebuild_reasons(entry, old_entry, dest_changed=False, assets_changed=False, converter_changed=False):
+    if old_entry is None:
+        return ["new page"]
+
+    reasons = []
+    if converter_changed:
+        reasons.append("converter version changed")
+    if dest_changed:
+        reasons.append("output directory changed")
+    if assets_changed:
+        reasons.append("asset fingerprints changed")
+    if old_entry["hash"] != entry["hash"]:
+        reasons.append("source changed")
+    old_deps = old_entry.get("deps", {})
+    for path, digest in entry["deps"].items():
+        if path not in old_deps:
+            reasons.append(f"new dependency {path}")
+        elif old_deps[path] != digest:
+            reasons.append(f"{path} changed" if digest is not None else f"{path} missing")
+    if not os.path.exists(entry["output"]):
+        reasons.append("output missing")
+    return reasons
+
+def write_manifest(dir_path_content, template_path, dest_dir_path, manifest_path, static_dir=None):
+    save_json(manifest_path, {"template": hash_file(template_path),
+                              "dest": dest_dir_path,
+                              "assets": assets_digest(),
+                              "converter": converter_version,
+                              "pages": page_entries(dir_path_content, dest_dir_path,
+                                                    template_path, static_dir)})
+
+def remove_output(output_path, dest_dir_path):
+    if os.path.exists(output_path):
+        os.remove(output_path)
+
+    #Clean up directories left empty by the removed page
+    directory = os.path.dirname(output_path)
+    root = os.path.abspath(dest_dir_path)
+    while os.path.abspath(directory).startswith(root + os.sep) and not os.listdir(directory):
+        os.rmdir(directory)
+        directory = os.path.dirname(directory)
+
+def incremental_build(dir_path_content, template_path, dest_dir_path, manifest_path, jobs=1,
+                      static_dir=None, explain=False, pipelined=False, pages=None):
+    manifest = load_manifest(manifest_path)
+    old_pages = manifest["pages"]
+    dest_changed = manifest["dest"] != dest_dir_path
+    #The template and every page may link any asset, so a new asset map rebuilds everything
+    assets_changed = manifest.get("assets", "") != assets_digest()
+    #Markdown that renders differently under a new converter leaves every old output stale
+    converter_changed = manifest.get("converter") != converter_version
+
+    pages = page_entries(dir_path_content, dest_dir_path, template_path, static_dir, old_pages, pages)
+    reasons = {}
+    for from_path, entry in pages.items():
+        page_reasons = rebuild_reasons(entry, old_pages.get(from_path), dest_changed, assets_changed,
+                                       converter_changed)
+        if page_reasons:
+            reasons[from_path] = page_reasons
+    stale_targets = set(pages[from_path]["target"] for from_path in reasons)
+    #A deleted page may have been the one whose output won its directory
+    stale_targets.update(old_entry["target"] for from_path, old_entry in old_pages.items()
+                         if from_path not in pages)
+
+    #Pages sharing a target are rendered together, in order, so the last one still wins
+    stale = []
+    for from_path, entry in pages.items():
+        if entry["target"] in stale_targets:
+            if explain:
+                print(f"Rebuilding {from_path}: " +
+                      "; ".join(reasons.get(from_path, [f"shares {entry['target']} with a rebuilt page"])))
+            stale.append((from_path, entry["target"]))
+    counts = generate_pages(stale, template_path, jobs, pipelined=pipelined)
+    generated = len(stale)
+
+    outputs = set(entry["output"] for entry in pages.values())
+    removed = 0
+    for from_path, old_entry in old_pages.items():
+        if from_path not in pages and old_entry["output"] not in outputs:
+            print(f"Removing {old_entry['output']} (source {from_path} was deleted or is a draft)")
+            logging.info(f"Removing {old_entry['output']} (source {from_path} was deleted or is a draft)")
+            remove_output(old_entry["output"], dest_dir_path)
+            removed += 1
+
+    print(f"Incremental build: {generated} generated, {len(pages) - generated} unchanged, {removed} removed")
+    save_json(manifest_path, {"template": hash_file(template_path),
+                              "dest": dest_dir_path,
+                              "assets": assets_digest(),
+                              "converter": converter_version,
+                              "pages": pages})
+    counts["deleted"] = removed
+    return counts
@@ -0,0 +1,144 @@
+import hashlib
+import os
+import sqlite3
+import time
+from conversion import converter_version
+from fingerprint import assets_digest
+
+#Settings for the per-process parse cache; worker processes open their own connection
+cache_settings = None
+open_caches = {}
+#Hits and misses counted in pool workers, reported by the process that closes the cache
+worker_counts = {"hits": 0, "misses": 0}
+
+
+class ParseCache:
+    def __init__(self, path, max_bytes):
+        #Pool workers open the cache at the same moment, so the directory may appear meanwhile
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.pending = {}
+        self.touched = {}
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS pages ("
+                                "key TEXT PRIMARY KEY, html TEXT, title TEXT, "
+                                "size INTEGER, used REAL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS pages_used ON pages (used)")
+        self.connection.commit()
+
+    def key(self, markdown):
+        #Rendered links point at fingerprinted assets, so the asset map is part of the key
+        digest = hashlib.sha256(converter_version.encode())
+        digest.update(b"\0")
+        digest.update(assets_digest().encode())
+        digest.update(b"\0")
+        digest.update(markdown.encode())
+        return digest.hexdigest()
+
+    def get(self, markdown):
+        key = self.key(markdown)
+        if key in self.pending:
+            self.hits += 1
+            return self.pending[key][:2]
+
+        row = self.connection.execute("SELECT html, title FROM pages WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.touched[key] = time.time()
+        self.flush_if_full()
+        return row
+
+    def put(self, markdown, html, title):
+        self.pending[self.key(markdown)] = (html, title, time.time())
+        self.flush_if_full()
+
+    def flush_if_full(self):
+        if len(self.pending) + len(self.touched) >= 64:
+            self.flush()
+
+    def flush(self):
+        if not self.pending and not self.touched:
+            return
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO pages (key, html, title, size, used) VALUES (?, ?, ?, ?, ?)",
+                [(key, html, title, len(html) + len(title), used)
+                 for key, (html, title, used) in self.pending.items()])
+            self.connection.executemany("UPDATE pages SET used = ? WHERE key = ?",
+                                        [(used, key) for key, used in self.touched.items()])
+        self.pending.clear()
+        self.touched.clear()
+
+    def evict(self):
+        #Drop least recently used pages until the cache fits in max_bytes
+        self.flush()
+        total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+
+        evicted = []
+        for key, size in self.connection.execute("SELECT key, size FROM pages ORDER BY used"):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        with self.connection:
+            self.connection.executemany("DELETE FROM pages WHERE key = ?", evicted)
+        return len(evicted)
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+def enable_cache(path, max_bytes):
+    global cache_settings
+    cache_settings = (path, max_bytes)
+
+def parse_cache_settings():
+    return cache_settings
+
+def active_cache():
+    if cache_settings is None:
+        return None
+    cache = open_caches.get(os.getpid())
+    if cache is None:
+        cache = ParseCache(*cache_settings)
+        open_caches[os.getpid()] = cache
+    return cache
+
+def cache_counts():
+    cache = open_caches.get(os.getpid())
+    return (cache.hits, cache.misses) if cache is not None else (0, 0)
+
+def add_worker_counts(hits, misses):
+    worker_counts["hits"] += hits
+    worker_counts["misses"] += misses
+
+def flush_cache():
+    cache = open_caches.get(os.getpid())
+    if cache is not None:
+        cache.flush()
+
+def close_cache():
+    cache = open_caches.pop(os.getpid(), None)
+    if cache is None and cache_settings is not None and any(worker_counts.values()):
+        #Every page was rendered in workers; open the cache here to evict and report
+        cache = ParseCache(*cache_settings)
+    if cache is None:
+        return
+    evicted = cache.evict()
+    hits = cache.hits + worker_counts["hits"]
+    misses = cache.misses + worker_counts["misses"]
+    worker_counts.update(hits=0, misses=0)
+    print(f"Parse cache: {hits} hits, {misses} misses, {evicted} evicted")
+    cache.close()
@@ -0,0 +1,116 @@
+import os
+import posixpath
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+from conversion import *
+from fingerprint import url_attribute_pattern
+from frontmatter import split_front_matter
+from writer import page_url
+
+#Set once per worker process so the site index is not pickled with every batch
+worker_index = None
+
+
+def site_index(paths, dest_dir_path):
+    #Every URL path that resolves to a file in the public directory, for O(1) lookups
+    index = set()
+    root = os.path.abspath(dest_dir_path)
+    for path in paths:
+        url = "/" + os.path.relpath(os.path.abspath(path), root).replace(os.sep, "/")
+        index.add(url)
+        if url.endswith("/index.html"):
+            directory = url[:-len("index.html")]
+            index.add(directory)
+            index.add(directory.rstrip("/") or "/")
+    return index
+
+def resolve_url(url, page_url):
+    #None for URLs the site does not serve (other hosts, mailto:, in-page anchors)
+    if url.startswith("/") and not url.startswith("//"):
+        path = url.split("#")[0].split("?")[0]
+        if "%" not in path and "/." not in path and "//" not in path:
+            return path
+
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    path = urllib.parse.unquote(parts.path)
+    if not path.startswith("/"):
+        path = posixpath.join(page_url, path)
+    resolved = posixpath.normpath(path)
+    return resolved + "/" if path.endswith("/") and resolved != "/" else resolved
+
+def inline_links(text, links):
+    #The link and image nodes text_to_textnodes would produce, without splitting out fonts
+    position = 0
+    for match in image_pattern.finditer(text):
+        for link in link_pattern.finditer(text, position, match.start()):
+            links.append(("link", link.group(2)))
+        links.append(("image", match.group(2)))
+        position = match.end()
+    for link in link_pattern.finditer(text, position):
+        links.append(("link", link.group(2)))
+
+def page_links(from_path):
+    links = []
+    with open(from_path, "r") as file:
+        markdown = file.read()
+    if "](" in markdown:
+        for block in iter_blocks(split_front_matter(markdown)[1].split("\n")):
+            if "](" not in block:
+                continue
+            for text in block_texts(block):
+                inline_links(text, links)
+    return links
+
+def set_worker_index(index):
+    global worker_index
+    worker_index = index
+
+def check_batch(batch, index=None):
+    if index is None:
+        index = worker_index
+    broken = []
+    checked = 0
+    for from_path, page_url in batch:
+        for kind, url in page_links(from_path):
+            resolved = resolve_url(url, page_url)
+            if resolved is None:
+                continue
+            checked += 1
+            if resolved not in index:
+                broken.append((from_path, kind, url))
+    return checked, broken
+
+def template_links(template_path):
+    with open(template_path, "r") as file:
+        return [match.group(3) for match in url_attribute_pattern.finditer(file.read())
+                if "{{" not in match.group(3)]
+
+def check_site(pages, template_path, paths, dest_dir_path, jobs=1):
+    #pages is find_pages() output; paths is every file the build left in the public directory
+    index = site_index(paths, dest_dir_path)
+    targets = [(from_path, page_url(target_path, dest_dir_path)) for from_path, target_path in pages]
+
+    if jobs <= 1 or len(targets) <= 1:
+        results = [check_batch(targets, index)]
+    else:
+        chunk_size = max(1, min(256, len(targets) // (jobs * 4)))
+        batches = [targets[i:i + chunk_size] for i in range(0, len(targets), chunk_size)]
+        with ProcessPoolExecutor(max_workers=jobs, initializer=set_worker_index,
+                                 initargs=(index,)) as executor:
+            results = list(executor.map(check_batch, batches))
+
+    checked = sum(count for count, _ in results)
+    broken = [entry for _, entries in results for entry in entries]
+    for url in template_links(template_path):
+        resolved = resolve_url(url, "/")
+        if resolved is not None:
+            checked += 1
+            if resolved not in index:
+                broken.append((template_path, "link", url))
+
+    for from_path, kind, url in broken:
+        print(f"Broken {kind} in {from_path}: {url}")
+    print(f"Checked {checked} links and images in {len(targets)} pages: {len(broken)} broken")
+    return broken
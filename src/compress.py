@@ -0,0 +1,69 @@
+import gzip
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+compressible_suffixes = (".html", ".css")
+
+
+def compressors():
+    encoders = [(".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        encoders.append((".br", lambda data: brotli.compress(data, quality=11)))
+    return encoders
+
+def compressed_suffixes():
+    return [suffix for suffix, _ in compressors()]
+
+def compressible(path):
+    return path.endswith(compressible_suffixes)
+
+def compressed_siblings(paths):
+    suffixes = compressed_suffixes()
+    return set(path + suffix for path in paths if compressible(path) for suffix in suffixes)
+
+def sibling_up_to_date(path, sibling_path):
+    #Siblings take the source's mtime, so an untouched source (see writer.write_output) is skipped
+    try:
+        return os.stat(sibling_path).st_mtime_ns == os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+def compress_file(path):
+    written = 0
+    data = None
+    for suffix, encode in compressors():
+        sibling_path = path + suffix
+        if sibling_up_to_date(path, sibling_path):
+            continue
+        if data is None:
+            with open(path, "rb") as file:
+                data = file.read()
+
+        directory, name = os.path.split(sibling_path)
+        temp_path = os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+        with open(temp_path, "wb") as file:
+            file.write(encode(data))
+        stat = os.stat(path)
+        os.utime(temp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.replace(temp_path, sibling_path)
+        written += 1
+    return written
+
+def compress_tree(paths, jobs=1):
+    paths = sorted(path for path in paths if compressible(path))
+    if jobs <= 1 or len(paths) <= 1:
+        written = [compress_file(path) for path in paths]
+    else:
+        chunk_size = max(1, min(64, len(paths) // (jobs * 4)))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            written = list(executor.map(compress_file, paths, chunksize=chunk_size))
+
+    compressed = sum(1 for count in written if count)
+    print(f"Compressed {compressed} files ({sum(written)} siblings written), "
+          f"{len(paths) - compressed} up to date")
+    return sum(written)
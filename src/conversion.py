@@ -1,6 +1,12 @@
+import functools
 import re
 from textnode import TextNode
 from htmlnode import HTMLNode, LeafNode, ParentNode
+from profiler import phase, block_phase
+from fingerprint import asset_url
+
+#Bump whenever the markdown -> HTML output changes so cached pages are re-rendered
+converter_version = "2"
 
 block_type_paragraph = "paragraph"
 block_type_heading = "heading"
@@ -9,6 +15,16 @@ block_type_quote = "quote"
 block_type_olist = "ordered"
 block_type_ulist = "unordered"
 
+image_pattern = re.compile(r"!\[(.*?)\]\((.*?)\)")
+link_pattern = re.compile(r"\[(.*?)\]\((.*?)\)")
+inline_delimiters = (("**", "bold"), ("*", "italic"), ("`", "code"))
+
+#Repeated lines (nav snippets, footers, list items) are tokenized once per process
+inline_cache_size = 4096
+inline_cache_max_length = 1024
+#Lookups made in pool workers, added to this process's counts by inline_cache_stats
+worker_inline_counts = {"hits": 0, "misses": 0}
+
 
 def textnode_to_htmlnode(textnode: TextNode):
     if not isinstance(textnode, TextNode):
@@ -23,10 +39,10 @@ def textnode_to_htmlnode(textnode: TextNode):
     elif textnode.text_type == "code":
         return LeafNode(textnode.text, "code")
     elif textnode.text_type == "link":
-        return LeafNode(textnode.text, "a",{"href": textnode.url})
+        return LeafNode(textnode.text, "a",{"href": asset_url(textnode.url)})
     elif textnode.text_type == "image":
         return LeafNode("Image", "img",
-                        {"src": textnode.url,
+                        {"src": asset_url(textnode.url),
                          "alt": textnode.text})
     else:
         raise Exception("Text type not supported.")
@@ -65,13 +81,11 @@ def split_nodes_delimiter(old_nodes, delimiter):
     return new_nodes 
     
 def extract_markdown_images(text):
-    pattern = r"!\[(.*?)\]\((.*?)\)"
-    images = re.findall(pattern, text)
+    images = image_pattern.findall(text)
     return images
 
 def extract_markdown_links(text):
-    pattern = r"\[(.*?)\]\((.*?)\)"
-    links = re.findall(pattern, text)
+    links = link_pattern.findall(text)
     return links
 
 def split_nodes_image(old_nodes):
@@ -117,146 +131,197 @@ def split_nodes_link(old_nodes):
     return new_nodes
 
 def text_to_textnodes(text):
-    #Make into TextNode
-    new_textnode = TextNode(text, "text")
-    
-    #Pull out all the links then images
-    no_images = split_nodes_image([new_textnode])
-    no_links = split_nodes_link(no_images)
-
-    #Filter out Bold > Italic > Code fonts
-    no_bold = split_nodes_delimiter(no_links, "**")
-    no_italics = split_nodes_delimiter(no_bold, "*")
-    final_list = split_nodes_delimiter(no_italics, "`")
-
-    return final_list
+    nodes = []
+    position = 0
+
+    #Pull out images, then links between them, then Bold > Italic > Code fonts
+    for match in image_pattern.finditer(text):
+        split_text_links(text, position, match.start(), nodes)
+        nodes.append(TextNode(match.group(1), "image", match.group(2)))
+        position = match.end()
+    split_text_links(text, position, len(text), nodes)
+
+    return nodes
+
+def split_text_links(text, start, end, nodes):
+    position = start
+    for match in link_pattern.finditer(text, start, end):
+        split_text_delimiters(text[position:match.start()], nodes)
+        nodes.append(TextNode(match.group(1), "link", match.group(2)))
+        position = match.end()
+    split_text_delimiters(text[position:end], nodes)
+
+def split_text_delimiters(text, nodes, level=0):
+    if level == len(inline_delimiters):
+        if text != "":
+            nodes.append(TextNode(text, "text"))
+        return
+
+    delimiter, text_type = inline_delimiters[level]
+    if delimiter not in text:
+        split_text_delimiters(text, nodes, level + 1)
+        return
+
+    parts = text.split(delimiter)
+    for i in range(0, len(parts)):
+        if i % 2 == 0:
+            split_text_delimiters(parts[i], nodes, level + 1)
+        elif parts[i] != "":
+            nodes.append(TextNode(parts[i], text_type))
 
 def markdown_to_blocks(markdown):
-    lines = markdown.split("\n")
-    blocks, current_block = [], []
-    
-    def is_blank(line):
-        return not line.strip()
-    
-    def append_current_block():
-        if current_block:
-            block_text = '\n'.join(current_block).strip()
-            if block_text:
-                blocks.append(block_text)
-            current_block.clear()
+    return list(iter_blocks(markdown.split("\n")))
 
+def iter_blocks(lines):
+    #Lines may come straight from a file handle, so blocks are yielded as soon as they close
+    current_block = []
     in_code_block = False
 
     for line in lines:
+        if line.endswith("\n"):
+            line = line[:-1]
         if in_code_block:
             current_block.append(line)
             if line.strip().endswith("```"):
                 in_code_block = False
         elif line.strip().startswith("```"):
-            append_current_block()
+            block_text = '\n'.join(current_block).strip()
+            if block_text:
+                yield block_text
+            current_block.clear()
             in_code_block = True
             current_block.append(line)
-        elif is_blank(line):
-            append_current_block()
+        elif not line.strip():
+            block_text = '\n'.join(current_block).strip()
+            if block_text:
+                yield block_text
+            current_block.clear()
         else:
             current_block.append(line)
-    
-    append_current_block()
 
-    return blocks
+    block_text = '\n'.join(current_block).strip()
+    if block_text:
+        yield block_text
 
-def block_to_block_type(block):
+def classify_block(block):
+    #Dispatch on the first character and hand the split lines on to the converter
     if block == "":
         raise ValueError("Block cannot be empty.")
-    
+
     lines = block.split("\n")
+    classifier = block_classifiers.get(block[0])
+    if classifier is None:
+        return block_type_paragraph, lines
+    return classifier(block, lines), lines
+
+def block_to_block_type(block):
+    return classify_block(block)[0]
+
+def heading_level(block):
+    level = 0
+    while level < 7 and level < len(block) and block[level] == "#":
+        level += 1
+    return level
+
+def classify_heading(block, lines):
+    level = heading_level(block)
+    if level <= 6 and block[level:level + 1] == " ":
+        return block_type_heading
+    return block_type_paragraph
 
-    if (
-        block.startswith("# ")
-        or block.startswith("## ")
-        or block.startswith("### ")
-        or block.startswith("#### ")
-        or block.startswith("##### ")
-        or block.startswith("###### ")
-    ):
-        return block_type_heading              
+def classify_code(block, lines):
     if len(lines) > 1 and lines[0].startswith("```") and lines[-1].startswith("```"):
         return block_type_code
-    if block.startswith(">"):
-        for line in lines:
-            if not line.startswith(">"):
-                return block_type_paragraph
-        return block_type_quote
-    if block.startswith("* "):
-        for line in lines:
-            if not line.startswith("* "):
-                return block_type_paragraph
-        return block_type_ulist
-    if block.startswith("- "):
-        for line in lines:
-            if not line.startswith("- "):
-                return block_type_paragraph
-        return block_type_ulist
-    if block.startswith("1. "):
-        i = 1
-        for line in lines:
-            if not line.startswith(f"{i}. "):
-                return block_type_paragraph
-            i += 1
-        return block_type_olist
     return block_type_paragraph
-    
+
+def classify_quote(block, lines):
+    for line in lines:
+        if not line.startswith(">"):
+            return block_type_paragraph
+    return block_type_quote
+
+def classify_ulist(block, lines):
+    marker = block[:2]
+    if marker != "* " and marker != "- ":
+        return block_type_paragraph
+    for line in lines:
+        if not line.startswith(marker):
+            return block_type_paragraph
+    return block_type_ulist
+
+def classify_olist(block, lines):
+    i = 1
+    for line in lines:
+        if not line.startswith(f"{i}. "):
+            return block_type_paragraph
+        i += 1
+    return block_type_olist
+
+block_classifiers = {
+    "#": classify_heading,
+    "`": classify_code,
+    ">": classify_quote,
+    "*": classify_ulist,
+    "-": classify_ulist,
+    "1": classify_olist,
+}
+
+@functools.lru_cache(maxsize=inline_cache_size)
+def cached_textnodes(text):
+    return tuple(text_to_textnodes(text))
+
+def inline_cache_stats():
+    info = cached_textnodes.cache_info()
+    hits = info.hits + worker_inline_counts["hits"]
+    misses = info.misses + worker_inline_counts["misses"]
+    lookups = hits + misses
+    return {"hits": hits,
+            "misses": misses,
+            "size": info.currsize,
+            "maxsize": info.maxsize,
+            "hit_rate": hits / lookups if lookups else 0.0}
+
+def inline_cache_counts():
+    #This process's own lookups, so a worker can report what one batch added
+    info = cached_textnodes.cache_info()
+    return info.hits, info.misses
+
+def add_worker_inline_counts(hits, misses):
+    worker_inline_counts["hits"] += hits
+    worker_inline_counts["misses"] += misses
+
+def clear_inline_cache():
+    cached_textnodes.cache_clear()
+    worker_inline_counts.update(hits=0, misses=0)
+
 def text_to_children(text):
     children = []
 
-    textnodes = text_to_textnodes(text) 
+    with phase("inline parsing"):
+        if len(text) <= inline_cache_max_length:
+            textnodes = cached_textnodes(text)
+        else:
+            textnodes = text_to_textnodes(text)
 
-    for node in textnodes:
-        htmlnode = textnode_to_htmlnode(node)
-        children.append(htmlnode)
+        for node in textnodes:
+            htmlnode = textnode_to_htmlnode(node)
+            children.append(htmlnode)
     return children
 
-def block_to_html_node(block):
-    block_type = block_to_block_type(block)
-    if block_type == block_type_paragraph:
-        return paragraph_to_html_node(block)
-    if block_type == block_type_heading:
-        return heading_to_html_node(block)
-    if block_type == block_type_code:
-        return code_to_html_node(block)
-    if block_type == block_type_olist:
-        return olist_to_html_node(block)
-    if block_type == block_type_ulist:
-        return ulist_to_html_node(block)
-    if block_type == block_type_quote:
-        return quote_to_html_node(block)
-    raise ValueError("Invalid block type")
-
-def paragraph_to_html_node(block):
-    lines = block.split("\n")
+def paragraph_to_html_node(block, lines=None):
+    if lines is None:
+        lines = block.split("\n")
     paragraph = " ".join(lines)
     children = text_to_children(paragraph)
     return ParentNode(children, "p")
 
-def heading_to_html_node(block):
-    if block.startswith("######"):
-        n = 6
-    elif block.startswith("#####"):
-        n = 5
-    elif block.startswith("####"):
-        n = 4
-    elif block.startswith("###"):
-        n = 3
-    elif block.startswith("##"):
-        n = 2
-    elif block.startswith("#"):
-        n = 1
-
+def heading_to_html_node(block, lines=None):
+    n = heading_level(block)
     text = block[n+1:]
     children = text_to_children(text)
     return ParentNode(children, f"h{n}")
 
-def code_to_html_node(block):
+def code_to_html_node(block, lines=None):
     if not block.startswith("```") or not block.endswith("```"):
         raise ValueError("Invalid code block")
     text = block[4:-3]
@@ -264,8 +329,8 @@ def code_to_html_node(block):
     code = ParentNode(children, "code")
     return ParentNode([code], "pre")
 
-def olist_to_html_node(block):
-    items = block.split("\n")
+def olist_to_html_node(block, lines=None):
+    items = lines if lines is not None else block.split("\n")
     html_items = []
 
     for item in items:
@@ -275,8 +340,8 @@ def olist_to_html_node(block):
 
     return ParentNode(html_items,"ol")
 
-def ulist_to_html_node(block):
-    items = block.split("\n")
+def ulist_to_html_node(block, lines=None):
+    items = lines if lines is not None else block.split("\n")
     html_items = []
 
     for item in items:
@@ -286,8 +351,9 @@ def ulist_to_html_node(block):
 
     return ParentNode(html_items, "ul")
 
-def quote_to_html_node(block):
-    lines = block.split("\n")
+def quote_to_html_node(block, lines=None):
+    if lines is None:
+        lines = block.split("\n")
     new_lines = []
 
     for line in lines:
@@ -300,8 +366,39 @@ def quote_to_html_node(block):
 
     return ParentNode(children, "blockquote")
 
+def block_texts(block):
+    #The inline text each block converter hands to text_to_children, without building nodes
+    block_type, lines = classify_block(block)
+    if block_type == block_type_heading:
+        return [block[heading_level(block) + 1:]]
+    if block_type == block_type_code:
+        return [block[4:-3]]
+    if block_type == block_type_olist:
+        return [line[3:] for line in lines]
+    if block_type == block_type_ulist:
+        return [line[2:] for line in lines]
+    if block_type == block_type_quote:
+        return [" ".join(line.lstrip(">").strip() for line in lines)]
+    return [" ".join(lines)]
+
+def block_textnodes(block):
+    #TextNodes of a block in order, through the same inline memo the converters use
+    for text in block_texts(block):
+        if len(text) <= inline_cache_max_length:
+            yield from cached_textnodes(text)
+        else:
+            yield from text_to_textnodes(text)
+
+def iter_markdown_html(lines):
+    #Convert and serialize one block at a time so only the current block is in memory
+    yield "<div>"
+    for block in iter_blocks(lines):
+        yield from block_to_html_node(block).iter_html()
+    yield "</div>"
+
 def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
+    with phase("markdown_to_blocks"):
+        blocks = markdown_to_blocks(markdown)
     children = []
 
     for block in blocks:
@@ -310,17 +407,16 @@ def markdown_to_html_node(markdown):
     return ParentNode(children, "div")
 
 def block_to_html_node(block):
-    block_type = block_to_block_type(block)
-    if block_type == block_type_paragraph:
-        return paragraph_to_html_node(block)
-    if block_type == block_type_heading:
-        return heading_to_html_node(block)
-    if block_type == block_type_code:
-        return code_to_html_node(block)
-    if block_type == block_type_olist:
-        return olist_to_html_node(block)
-    if block_type == block_type_ulist:
-        return ulist_to_html_node(block)
-    if block_type == block_type_quote:
-        return quote_to_html_node(block)
-    raise ValueError("Invalid block type")
\ No newline at end of file
+    with phase("block typing"):
+        block_type, lines = classify_block(block)
+    with block_phase(block_type):
+        return block_converters[block_type](block, lines)
+
+block_converters = {
+    block_type_paragraph: paragraph_to_html_node,
+    block_type_heading: heading_to_html_node,
+    block_type_code: code_to_html_node,
+    block_type_olist: olist_to_html_node,
+    block_type_ulist: ulist_to_html_node,
+    block_type_quote: quote_to_html_node,
+}
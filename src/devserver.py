@@ -0,0 +1,282 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+from build import generate_page, is_published, remove_output, page_entry
+from cache import flush_cache
+from conversion import converter_version
+from sync import copy_file
+from manifest import hash_file, load_manifest
+from writer import save_json
+
+
+def scan_tree(path):
+    files = {}
+    if os.path.isfile(path):
+        stat = os.stat(path)
+        files[path] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    stack = [path] if os.path.isdir(path) else []
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    stack.append(entry.path)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+def diff_tree(old, new):
+    changed = [path for path, key in new.items() if old.get(path) != key]
+    removed = [path for path in old if path not in new]
+    return sorted(changed), sorted(removed)
+
+def update_tree(files, root, paths):
+    #Restats only the paths reported as changed under root and updates files in place
+    changed = set()
+    removed = set()
+    for path in paths:
+        if path != root and not path.startswith(root + os.sep):
+            continue
+        new = scan_tree(path)
+        if path in new or path in files:
+            old = {path: files[path]} if path in files else {}
+        else:
+            #A directory appeared or went away; only then are its old entries looked up
+            prefix = path + os.sep
+            old = {other: key for other, key in files.items() if other.startswith(prefix)}
+        for other, key in new.items():
+            if files.get(other) != key:
+                files[other] = key
+                changed.add(other)
+        for other in old:
+            if other not in new:
+                del files[other]
+                removed.add(other)
+    return sorted(changed), sorted(removed)
+
+class Inotify:
+    #Linux change notifications, so an idle watch does no work and a save is seen as it happens
+    IN_MODIFY = 0x2
+    IN_ATTRIB = 0x4
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_DELETE_SELF = 0x400
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ONLYDIR = 0x1000000
+    IN_ISDIR = 0x40000000
+    mask = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+            | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR)
+    event = struct.Struct("iIII")
+
+    def __init__(self):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}
+
+    def add(self, path, recursive=True):
+        #Reported paths are joined onto path as given, so they match the keys scan_tree produces
+        if not os.path.isdir(path or "."):
+            return
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path or "."), self.mask)
+        if wd < 0:
+            #ENOSPC here means fs.inotify.max_user_watches is too low for the tree
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"Cannot watch {path}: {os.strerror(errno)}")
+        self.watches[wd] = path
+        if recursive:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        self.add(entry.path)
+
+    def read(self, timeout=None):
+        #Changed paths since the last read, an empty set on timeout, or None if events were dropped
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return set()
+        paths = set()
+        overflow = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = self.event.unpack_from(data, offset)
+                name = data[offset + self.event.size:offset + self.event.size + length].rstrip(b"\0")
+                offset += self.event.size + length
+                if mask & self.IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                directory = self.watches.get(wd)
+                if mask & self.IN_IGNORED:
+                    self.watches.pop(wd, None)
+                    continue
+                if directory is None:
+                    continue
+                path = os.path.join(directory, os.fsdecode(name)) if name else directory
+                paths.add(path)
+                if mask & self.IN_ISDIR and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    #Files written before the new watch exists are found when the directory is rescanned
+                    self.add(path)
+        return None if overflow else paths
+
+    def close(self):
+        os.close(self.fd)
+
+def notifier_for(watcher):
+    #None when inotify is unavailable (other platforms, or too few inotify watches allowed)
+    try:
+        notifier = Inotify()
+    except OSError:
+        return None
+    try:
+        notifier.add(watcher.content_dir)
+        notifier.add(watcher.static_dir)
+        #The template's directory is watched on its own, so an editor replacing the file is still seen
+        notifier.add(os.path.dirname(watcher.template_path), recursive=False)
+    except OSError as e:
+        print(f"Falling back to polling: {e}")
+        notifier.close()
+        return None
+    return notifier
+
+class SiteWatcher:
+    def __init__(self, content_dir, static_dir, template_path, dest_dir, manifest_path):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.dest_dir = dest_dir
+        self.manifest_path = manifest_path
+        self.manifest = load_manifest(manifest_path)
+        self.content = scan_tree(content_dir)
+        self.static = scan_tree(static_dir)
+        self.template = scan_tree(template_path)
+
+    def page_target(self, from_path):
+        relative = os.path.relpath(from_path, self.content_dir)
+        return os.path.dirname(os.path.join(self.dest_dir, relative))
+
+    def poll(self, paths=None):
+        #paths are the files and directories reported as changed; None rescans all three trees
+        if paths is None:
+            content = scan_tree(self.content_dir)
+            static = scan_tree(self.static_dir)
+            template = scan_tree(self.template_path)
+
+            content_changed, content_removed = diff_tree(self.content, content)
+            static_changed, static_removed = diff_tree(self.static, static)
+            template_changed = template != self.template
+            self.content, self.static, self.template = content, static, template
+        else:
+            content_changed, content_removed = update_tree(self.content, self.content_dir, paths)
+            static_changed, static_removed = update_tree(self.static, self.static_dir, paths)
+            template_changed = any(update_tree(self.template, self.template_path, paths))
+
+        if template_changed:
+            content_changed = sorted(self.content)
+        else:
+            #Pages that embed a changed asset are rebuilt along with it
+            assets = set(os.path.normpath(path) for path in static_changed + static_removed)
+            dependents = [from_path for from_path, entry in self.manifest["pages"].items()
+                          if from_path in self.content and assets.intersection(entry.get("deps", {}))]
+            content_changed = sorted(set(content_changed).union(dependents))
+
+        for from_path in static_changed:
+            self.copy_asset(from_path)
+        for from_path in static_removed:
+            self.remove_asset(from_path)
+        for from_path in content_removed:
+            self.remove_page(from_path)
+        for from_path in content_changed:
+            if not is_published(from_path):
+                self.remove_page(from_path)
+        for directory in sorted(set(os.path.dirname(path) for path in content_changed + content_removed)):
+            self.rebuild_directory(directory)
+
+        changes = len(content_changed) + len(content_removed) + len(static_changed) + len(static_removed)
+        if content_changed or content_removed:
+            self.manifest["template"] = hash_file(self.template_path)
+            self.manifest["dest"] = self.dest_dir
+            self.manifest["converter"] = converter_version
+            save_json(self.manifest_path, self.manifest)
+            #The server may run for hours; keep what was rendered rather than waiting for 64 entries
+            flush_cache()
+        return changes
+
+    def rebuild_directory(self, directory):
+        #Every page in a directory writes the same index.html; render them in build order so the last still wins
+        if not os.path.isdir(directory):
+            return
+        for name in sorted(os.listdir(directory)):
+            from_path = os.path.join(directory, name)
+            if from_path in self.content and is_published(from_path):
+                self.rebuild_page(from_path)
+
+    def rebuild_page(self, from_path):
+        target_path = self.page_target(from_path)
+        try:
+            generate_page(from_path, self.template_path, target_path)
+        except Exception as e:
+            #Keep watching; the page is retried on its next save
+            print(f"Failed to generate {from_path}: {type(e).__name__}: {e}")
+            logging.error(f"Failed to generate {from_path}: {type(e).__name__}: {e}")
+            return
+        self.manifest["pages"][from_path] = page_entry(from_path, target_path, self.template_path,
+                                                       self.static_dir)
+
+    def remove_page(self, from_path):
+        entry = self.manifest["pages"].pop(from_path, None)
+        if entry is None:
+            return
+        for other in self.manifest["pages"].values():
+            if other["output"] == entry["output"]:
+                return
+        print(f"Removing {entry['output']} (source {from_path} was deleted or is a draft)")
+        remove_output(entry["output"], self.dest_dir)
+
+    def copy_asset(self, from_path):
+        dest_path = os.path.join(self.dest_dir, os.path.relpath(from_path, self.static_dir))
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        print(f" * {from_path} -> {dest_path}")
+        copy_file(from_path, dest_path)
+
+    def remove_asset(self, from_path):
+        dest_path = os.path.join(self.dest_dir, os.path.relpath(from_path, self.static_dir))
+        print(f"Removing {dest_path} (source {from_path} was deleted)")
+        remove_output(dest_path, self.dest_dir)
+
+def watch(watcher, interval=0.05):
+    #Waits on inotify where available; otherwise rescans every tree each interval
+    notifier = notifier_for(watcher)
+    if notifier is None:
+        print(f"Polling for changes every {interval * 1000:.0f} ms")
+    try:
+        while True:
+            if notifier is None:
+                time.sleep(interval)
+                paths = None
+            else:
+                paths = notifier.read()
+            start = time.perf_counter()
+            changes = watcher.poll(paths)
+            if changes:
+                print(f"Rebuilt {changes} changed file(s) in {(time.perf_counter() - start) * 1000:.0f} ms")
+    finally:
+        if notifier is not None:
+            notifier.close()
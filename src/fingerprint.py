@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from manifest import hash_file
+from sync import copy_file, files_match
+from writer import save_json
+
+fingerprint_length = 10
+url_attribute_pattern = re.compile(r"""\b(href|src)=(["'])(.*?)\2""")
+
+#Set by enable_fingerprints(); maps "/index.css" to "/index.<hash>.css" for every static file
+asset_map = None
+asset_digest = ""
+
+
+def fingerprint_path(path, digest):
+    root, ext = os.path.splitext(path)
+    return f"{root}.{digest[:fingerprint_length]}{ext}"
+
+def load_hash_cache(path):
+    try:
+        with open(path, "r") as file:
+            hashes = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    return hashes if isinstance(hashes, dict) else {}
+
+def hash_assets(static_dir, cache_path, jobs=1):
+    #Digests are reused while a file's mtime and size match the cached entry
+    cached = load_hash_cache(cache_path)
+    entries = {}
+    stale = []
+    for root, _, files in os.walk(static_dir):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            relative = os.path.relpath(path, static_dir).replace(os.sep, "/")
+            stat = os.stat(path)
+            entry = cached.get(relative)
+            if entry is not None and entry[:2] == [stat.st_mtime_ns, stat.st_size]:
+                entries[relative] = entry
+            else:
+                entries[relative] = [stat.st_mtime_ns, stat.st_size, None]
+                stale.append(relative)
+
+    paths = [os.path.join(static_dir, relative) for relative in stale]
+    if jobs <= 1 or len(paths) <= 1:
+        digests = [hash_file(path) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            digests = list(executor.map(hash_file, paths, chunksize=max(1, len(paths) // (jobs * 4))))
+    for relative, digest in zip(stale, digests):
+        entries[relative][2] = digest
+
+    print(f"Hashed {len(stale)} static files, {len(entries) - len(stale)} unchanged")
+    save_json(cache_path, entries)
+    return {relative: entry[2] for relative, entry in entries.items()}
+
+def build_asset_map(hashes):
+    return {"/" + relative: "/" + fingerprint_path(relative, digest)
+            for relative, digest in hashes.items()}
+
+def write_fingerprinted(static_dir, dest_dir, hashes, hardlink=False):
+    written = set()
+    for relative, digest in hashes.items():
+        from_path = os.path.join(static_dir, *relative.split("/"))
+        dest_path = os.path.normpath(os.path.join(dest_dir, *fingerprint_path(relative, digest).split("/")))
+        if not files_match(from_path, dest_path):
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            copy_file(from_path, dest_path, hardlink)
+        written.add(dest_path)
+    return written
+
+def enable_fingerprints(mapping):
+    global asset_map, asset_digest
+    asset_map = mapping
+    asset_digest = hashlib.sha256(json.dumps(mapping, sort_keys=True).encode()).hexdigest()
+
+def disable_fingerprints():
+    global asset_map, asset_digest
+    asset_map = None
+    asset_digest = ""
+
+def assets_digest():
+    return asset_digest
+
+def fingerprint_map():
+    return asset_map
+
+def asset_url(url):
+    if asset_map is None or url is None or not url.startswith("/"):
+        return url
+    path = url.split("#")[0].split("?")[0]
+    return asset_map.get(path, path) + url[len(path):]
+
+def rewrite_urls(html):
+    if asset_map is None:
+        return html
+    return url_attribute_pattern.sub(
+        lambda match: f"{match.group(1)}={match.group(2)}{asset_url(match.group(3))}{match.group(2)}", html)
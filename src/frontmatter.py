@@ -0,0 +1,51 @@
+import itertools
+
+#Opening fence -> key/value separator: YAML-style "---" with "key: value", TOML-style "+++" with "key = value"
+front_matter_fences = {"---": ":", "+++": "="}
+
+
+def parse_value(value):
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    if value in ("true", "false"):
+        return value == "true"
+    return value
+
+def read_front_matter(lines):
+    #Consumes the header from an iterator of lines (usually an open file) and leaves the body
+    #unread; returns ({}, first_line) when there is no front matter so no line is lost
+    first = next(lines, None)
+    fence = first.rstrip("\n").strip() if first is not None else None
+    if fence not in front_matter_fences:
+        return {}, first
+
+    separator = front_matter_fences[fence]
+    values = {}
+    for line in lines:
+        line = line.rstrip("\n")
+        if line.strip() == fence:
+            return values, None
+        key, found, value = line.partition(separator)
+        if found and key.strip() and not line.startswith((" ", "#")):
+            values[key.strip()] = parse_value(value)
+    raise ValueError("Front matter is not closed")
+
+def body_lines(file):
+    #Front matter values and the body's lines, reading no further than the header yet
+    values, first = read_front_matter(file)
+    return values, itertools.chain([first] if first is not None else [], file)
+
+def split_front_matter(markdown):
+    if not markdown.startswith(tuple(front_matter_fences)):
+        return {}, markdown
+    lines = iter(markdown.splitlines(keepends=True))
+    values, first = read_front_matter(lines)
+    return values, (first or "") + "".join(lines)
+
+def read_page_header(path):
+    with open(path, "r") as file:
+        return read_front_matter(file)[0]
+
+def is_draft(values):
+    return values.get("draft") is True
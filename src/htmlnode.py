@@ -1,4 +1,7 @@
 class HTMLNode:
+    #Pages allocate tens of thousands of nodes, so skip the per-instance __dict__
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -6,7 +9,13 @@ class HTMLNode:
         self.props = props
 
     def to_html(self):
+        return "".join(self.iter_html())
+
+    def iter_html(self):
         raise NotImplementedError
+
+    def write_html(self, file):
+        file.writelines(self.iter_html())
     
     def props_to_html(self):
         prop_dict = self.props
@@ -23,6 +32,8 @@ class HTMLNode:
         return f"HTMLNode({self.tag}, {self.value}, {self.children}, {self.props})"
     
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, value, tag=None, props=None):
         super().__init__(tag, value, None, props)
         if self.value == None or self.value == "":
@@ -31,20 +42,17 @@ class LeafNode(HTMLNode):
     def to_html(self):
         if self.tag == None or self.tag == "":
             return self.value
-        html_str = ""
-
-        html_str += f"<{self.tag}"
+        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
 
-        if self.props != None and self.props != {}:
-            html_str += f"{self.props_to_html()}"
-        
-        html_str += f">{self.value}</{self.tag}>"
-        return html_str
+    def iter_html(self):
+        yield self.to_html()
     
     # def __repr__(self):
     #     return f"LeafNode({self.tag}, {self.value}, {self.props})"
     
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self,children, tag, props=None):
         super().__init__(tag, None, children, props)
         if self.children == None:
@@ -52,15 +60,31 @@ class ParentNode(HTMLNode):
         if self.tag == None or self.tag == "":
             raise ValueError("ParentNode must have tag")
         
-    def to_html(self):
+    def open_tag(self):
         if self.tag is None:
             raise ValueError("Invalid HTML: no tag")
         if self.children is None:
             raise ValueError("Invalid HTML: no children")
-        children_html = ""
-        for child in self.children:
-            children_html += child.to_html()
-        return f"<{self.tag}{self.props_to_html()}>{children_html}</{self.tag}>" 
+        return f"<{self.tag}{self.props_to_html()}>"
+
+    def iter_html(self):
+        #Walk the tree with an explicit stack so deep pages don't nest generators
+        yield self.open_tag()
+        stack = [(self, iter(self.children))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if isinstance(child, ParentNode):
+                    yield child.open_tag()
+                    stack.append((child, iter(child.children)))
+                    break
+                if isinstance(child, LeafNode):
+                    yield child.to_html()
+                else:
+                    yield from child.iter_html()
+            else:
+                stack.pop()
+                yield f"</{node.tag}>"
     
     def add_child(self, node):
         self.children.append(node)
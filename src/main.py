@@ -1,93 +1,217 @@
-import shutil
+import argparse
 import os
+import time
 import logging
-from conversion import *
-from htmlnode import *
-from textnode import *
-import re
+from build import *
+from cache import enable_cache, close_cache
+from compress import compress_tree, compressed_siblings
+from search import write_search_index
+from check import check_site
+from metadata import write_site_indexes
+from shard import finish_shard, find_shards, merge_shards, parse_shard, shard_dir, shard_pages, verify_shards
+from fingerprint import build_asset_map, enable_fingerprints, hash_assets, write_fingerprinted
+from profiler import phase, start_profiling, stop_profiling
+from devserver import SiteWatcher, watch
+from server import start_server
 
 
-logging.basicConfig(filename="/home/jallen/BootDev/StaticSiteGen/src/file_log.txt", level=1)
 source_dir = "./static"
 target_dir = "./public"
 content_path = "./content"
 template_path = "./template.html"
-
-def main():
-    print("Deleting public directory...")
-    logging.info("Deleting public directory...")
-    if os.path.exists(target_dir):
-        shutil.rmtree(target_dir)
-    
-    print("Copying static files to public directory...")
-    logging.info("Copying static files to public directory...")
-    copy_files_recursive(source_dir, target_dir)
-
-    generate_pages_recursive(content_path, template_path, target_dir)
-
-def copy_files_recursive(source_dir_path, dest_dir_path):
-    if not os.path.exists(dest_dir_path):
-        os.mkdir(dest_dir_path)
-
-    for filename in os.listdir(source_dir_path):
-        from_path = os.path.join(source_dir_path, filename)
-        dest_path = os.path.join(dest_dir_path, filename)
-        print(f" * {from_path} -> {dest_path}")
-        if os.path.isfile(from_path):
-            shutil.copy(from_path, dest_path)
+build_dir = "./.build"
+manifest_path = os.path.join(build_dir, "manifest.json")
+cache_path = os.path.join(build_dir, "parse_cache.sqlite")
+profile_path = os.path.join(build_dir, "profile.json")
+asset_hashes_path = os.path.join(build_dir, "asset_hashes.json")
+search_state_path = os.path.join(build_dir, "search_state.json")
+shards_dir = os.path.join(build_dir, "shards")
+metadata_path = os.path.join(build_dir, "metadata.json")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build the static site into the public directory.")
+    parser.add_argument("command", nargs="?", default="build", choices=["build", "serve", "check", "merge"],
+                        help="build the site (default), build it and serve the public directory, "
+                             "build it and check every link and image, "
+                             "or build it from the pages rendered by --shard builds")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only regenerate pages whose markdown or template changed since the last build")
+    parser.add_argument("--explain", action="store_true",
+                        help="with --incremental, print why each page is rebuilt")
+    parser.add_argument("--jobs", "-j", type=int, default=1, metavar="N",
+                        help="render pages across N worker processes (0 = one per CPU)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="overlap markdown reads, rendering and writes with an asyncio pipeline")
+    parser.add_argument("--checksum", action="store_true",
+                        help="compare static files by content hash instead of size and mtime")
+    parser.add_argument("--hardlink", action="store_true",
+                        help="hardlink static files into public instead of copying them")
+    parser.add_argument("--fingerprint", action="store_true",
+                        help="also publish static files as name.<hash>.ext and point pages and the template at them")
+    parser.add_argument("--search", action="store_true",
+                        help="write a sharded inverted search index of every page to public/search")
+    parser.add_argument("--drafts", action="store_true",
+                        help="also publish pages marked draft: true in their front matter")
+    parser.add_argument("--feeds", action="store_true",
+                        help="write sitemap.xml, rss.xml and listing pages for sections without an index page")
+    parser.add_argument("--base-url", default="http://localhost:8888", metavar="URL",
+                        help="absolute site URL used in sitemap.xml and rss.xml")
+    parser.add_argument("--compress", action="store_true",
+                        help="write precompressed .gz (and .br when brotli is installed) copies of HTML and CSS")
+    parser.add_argument("--shard", type=parse_shard, metavar="i/N",
+                        help=f"render only shard i of N (1-based) of the pages into {shards_dir}/i-of-N; "
+                             "run merge once every shard is done")
+    parser.add_argument("--shards", type=int, metavar="N",
+                        help="with merge, the shard count to merge when several builds are present")
+    parser.add_argument("--cache", action="store_true",
+                        help="reuse rendered HTML for unchanged markdown from an on-disk parse cache")
+    parser.add_argument("--cache-size", type=int, default=256, metavar="MB",
+                        help="evict least recently used pages once the parse cache exceeds MB megabytes")
+    parser.add_argument("--profile", nargs="?", const=profile_path, metavar="PATH",
+                        help=f"time each build phase per page and block type, save JSON to PATH (default {profile_path}); implies --jobs 1 without --pipeline")
+    parser.add_argument("--profile-top", type=int, default=10, metavar="N",
+                        help="number of slowest pages listed in the profile report")
+    parser.add_argument("--watch", action="store_true",
+                        help="with serve, rebuild changed pages and assets as files are saved")
+    parser.add_argument("--port", type=int, default=8888, help="port for serve (default 8888)")
+    parser.add_argument("--host", default="", help="address for serve to bind (default all interfaces)")
+    parser.add_argument("--memory-cache", type=int, default=64, metavar="MB",
+                        help="keep up to MB megabytes of hot files from public in memory while serving")
+    args = parser.parse_args(argv)
+    if args.pipeline and args.jobs != 1:
+        parser.error("--pipeline runs in one process and cannot be combined with --jobs")
+    if args.shard and (args.command != "build" or args.search or args.feeds or args.compress or args.profile):
+        parser.error("--shard only renders pages; search, feeds, compress, check and profile run on merge")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+
+    set_include_drafts(args.drafts)
+    if args.cache:
+        enable_cache(cache_path, args.cache_size * 1024 * 1024)
+
+    if args.command == "serve":
+        serve(args.port, args.watch, jobs, args.host, args.memory_cache * 1024 * 1024, args.compress)
+        return
+
+    if args.shard:
+        build_shard(args, jobs)
+        close_cache()
+        return
+
+    if args.profile:
+        #Phase timings are collected in-process, so profile on a single core and thread
+        jobs = 1
+        args.pipeline = False
+        start_profiling()
+
+    print("Syncing static files to public directory...")
+    logging.info("Syncing static files to public directory...")
+    with phase("static copy"):
+        assets = copy_files_recursive(source_dir, target_dir, args.checksum, args.hardlink)
+    if args.fingerprint:
+        with phase("fingerprint"):
+            hashes = hash_assets(source_dir, asset_hashes_path, jobs)
+            assets |= write_fingerprinted(source_dir, target_dir, hashes, args.hardlink)
+            enable_fingerprints(build_asset_map(hashes))
+
+    if args.command == "merge":
+        shards = find_shards(shards_dir, args.shards)
+        verify_shards(shards, find_pages(content_path, target_dir), content_path, template_path)
+        counts, _ = merge_shards(shards, target_dir, assets, args.hardlink)
+        counts["deleted"] = 0
+    elif args.incremental:
+        counts = incremental_build(content_path, template_path, target_dir, manifest_path, jobs,
+                                   source_dir, args.explain, args.pipeline)
+    else:
+        counts = generate_pages_recursive(content_path, template_path, target_dir, jobs, args.pipeline)
+        counts["deleted"] = 0
+        write_manifest(content_path, template_path, target_dir, manifest_path, source_dir)
+
+    #Anything in public/ that is neither a static file nor a page is stale
+    pages = find_pages(content_path, target_dir)
+    outputs = [os.path.join(dest_path, "index.html") for _, dest_path in pages]
+    keep = assets.union(outputs)
+    if args.feeds:
+        with phase("site indexes"):
+            keep |= write_site_indexes(pages, template_path, target_dir, metadata_path, args.base_url)
+    if args.search:
+        with phase("search index"):
+            keep |= write_search_index(content_path, target_dir, search_state_path, jobs)
+    if args.compress:
+        counts["deleted"] += prune_tree(target_dir, keep.union(compressed_siblings(keep)))
+        with phase("compress"):
+            compress_tree(keep, jobs)
+    else:
+        counts["deleted"] += prune_tree(target_dir, keep)
+    broken = []
+    if args.command == "check":
+        with phase("check"):
+            broken = check_site(pages, template_path, keep, target_dir, jobs)
+    close_cache()
+    print(f"Pages: {counts['written']} written, {counts['skipped']} unchanged and skipped, {counts['deleted']} deleted")
+
+    stats = inline_cache_stats()
+    if stats["hits"] + stats["misses"] > 0:
+        print(f"Inline cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
+
+    if args.profile:
+        profiler = stop_profiling()
+        profiler.save(args.profile)
+        print(profiler.report(args.profile_top))
+        print(f"Profile saved to {args.profile}")
+
+    if broken:
+        raise SystemExit(f"{len(broken)} broken links or images")
+
+def build_shard(args, jobs):
+    index, count = args.shard
+    root = shard_dir(shards_dir, index, count)
+    dest = os.path.join(root, "public")
+    if os.path.exists(os.path.join(root, "shard.json")):
+        os.remove(os.path.join(root, "shard.json"))
+
+    if args.fingerprint:
+        #Each shard keeps its own hash cache so side-by-side shards never share a file
+        enable_fingerprints(build_asset_map(hash_assets(source_dir, os.path.join(root, "asset_hashes.json"), jobs)))
+
+    pages = shard_pages(find_pages(content_path, dest), content_path, index, count)
+    print(f"Shard {index}/{count}: {len(pages)} pages")
+    if args.incremental:
+        counts = incremental_build(content_path, template_path, dest, os.path.join(root, "manifest.json"),
+                                   jobs, source_dir, args.explain, args.pipeline, pages)
+    else:
+        counts = generate_pages(pages, template_path, jobs, pipelined=args.pipeline)
+        counts["deleted"] = 0
+    counts["deleted"] += prune_tree(dest, [os.path.join(dest_path, "index.html") for _, dest_path in pages])
+    finish_shard(root, index, count, pages, content_path, template_path)
+    print(f"Pages: {counts['written']} written, {counts['skipped']} unchanged and skipped, {counts['deleted']} deleted")
+
+def serve(port, watch_files, jobs=1, host="", cache_bytes=64 * 1024 * 1024, compress=False):
+    assets = copy_files_recursive(source_dir, target_dir)
+    incremental_build(content_path, template_path, target_dir, manifest_path, jobs, source_dir)
+    if compress:
+        outputs = [os.path.join(dest_path, "index.html") for _, dest_path in find_pages(content_path, target_dir)]
+        compress_tree(assets.union(outputs), jobs)
+
+    server = start_server(target_dir, port, cache_bytes, host)
+    print(f"Serving {target_dir} on http://localhost:{port}")
+    try:
+        if watch_files:
+            print(f"Watching {content_path}, {source_dir} and {template_path} for changes...")
+            watch(SiteWatcher(content_path, source_dir, template_path, target_dir, manifest_path))
         else:
-            copy_files_recursive(from_path, dest_path)
-
-def extract_title(markdown):
-    blocks = markdown.split("\n")
-
-    for block in blocks:
-        if block.startswith("# "):
-            return block.lstrip("# ")
-    raise Exception("No header provided")
-
-def generate_page(from_path, template_path, target_path):
-    print(f"Generating page from {from_path} to {target_path} using {template_path}")
-    logging.info(f"Generating page from {from_path} to {target_path} using {template_path}")
-
-    with open(from_path, "r") as file:
-        md_contents = file.read()
-
-    with open(template_path, "r") as file:
-        template_contents = file.read()
-
-    html_str = markdown_to_html_node(md_contents).to_html()
-    title = extract_title(md_contents)
-    final = fill_template(html_str, title, template_contents)
-
-    if not os.path.exists(target_path):
-        os.makedirs(target_path)
-
-    full_path = os.path.join(target_path, "index.html")
-
-    f = open(full_path, 'w')
-    f.write(final)
-    f.close()    
-
-def fill_template(html_string, title, template):
-    temp = template
-
-    temp1 = temp.replace("{{ Title }}", title)
-    temp2 = temp1.replace("{{ Content }}", html_string)
-
-    return temp2
-
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path):
-    if os.path.isdir(dir_path_content):
-        items = os.listdir(dir_path_content)
-        for item in items:
-            new_path_content = os.path.join(dir_path_content, item)
-            new_path_dest = os.path.join(dest_dir_path, item)
-            generate_pages_recursive(new_path_content, template_path, new_path_dest)
-    elif os.path.isfile(dir_path_content):
-        dest_path = os.path.dirname(dest_dir_path)
-        generate_page(dir_path_content, template_path, dest_path)
-    
-
-
-main()
\ No newline at end of file
+            while True:
+                time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        close_cache()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(filename=os.path.join(os.path.dirname(os.path.abspath(__file__)), "file_log.txt"), level=1)
+    main()
\ No newline at end of file
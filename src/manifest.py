@@ -0,0 +1,29 @@
+import hashlib
+import json
+import os
+
+
+def empty_manifest():
+    return {"template": None, "dest": None, "pages": {}}
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return empty_manifest()
+
+    try:
+        with open(path, "r") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return empty_manifest()
+
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("pages"), dict):
+        return empty_manifest()
+    return manifest
+
@@ -0,0 +1,158 @@
+import datetime
+import email.utils
+import json
+import os
+from xml.sax.saxutils import escape
+from build import extract_title
+from conversion import *
+from frontmatter import body_lines
+from htmlnode import LeafNode, ParentNode
+from template import load_template, write_template
+from writer import page_url, save_json, write_output
+
+metadata_version = 1
+summary_length = 200
+feed_size = 20
+
+
+def parse_date(value):
+    if isinstance(value, str) and value:
+        try:
+            return datetime.date.fromisoformat(value[:10]).isoformat()
+        except ValueError:
+            return None
+    return None
+
+def plain_text(block):
+    return "".join(node.text for node in block_textnodes(block) if node.text_type != "image")
+
+def page_metadata(from_path):
+    #Reads only as far as the title and first paragraph, not the whole page
+    with open(from_path, "r") as file:
+        values, lines = body_lines(file)
+        title = values.get("title")
+        summary = values.get("summary")
+        for block in iter_blocks(lines):
+            if title is None and block.startswith("# "):
+                title = extract_title(block)
+            elif summary is None and block_to_block_type(block) == block_type_paragraph:
+                summary = plain_text(block).strip() or None
+            if title is not None and summary is not None:
+                break
+
+    if summary is not None and len(summary) > summary_length:
+        summary = summary[:summary_length].rsplit(" ", 1)[0] + "…"
+    return {"title": title or "",
+            "date": parse_date(values.get("date")),
+            "summary": summary or ""}
+
+def load_metadata_index(path):
+    try:
+        with open(path, "r") as file:
+            index = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(index, dict) or index.get("version") != metadata_version:
+        return {}
+    return index.get("pages", {})
+
+def metadata_index(pages, dest_dir_path, index_path):
+    #One scan shared by the sitemap, feed and section pages; unchanged files are not reopened
+    old_pages = load_metadata_index(index_path)
+    entries = {}
+    scanned = 0
+    for from_path, target_path in pages:
+        stat = os.stat(from_path)
+        key = [stat.st_mtime_ns, stat.st_size]
+        entry = old_pages.get(from_path)
+        if entry is None or entry["key"] != key:
+            entry = dict(page_metadata(from_path), key=key)
+            scanned += 1
+        entry["path"] = page_url(target_path, dest_dir_path)
+        entry["modified"] = datetime.date.fromtimestamp(stat.st_mtime).isoformat()
+        entries[from_path] = entry
+
+    save_json(index_path, {"version": metadata_version, "pages": entries})
+    print(f"Metadata index: {scanned} pages scanned, {len(entries) - scanned} unchanged")
+    return entries
+
+def sitemap_xml(entries, base_url):
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+    for entry in sorted(entries.values(), key=lambda entry: entry["path"]):
+        lines.append(f"<url><loc>{escape(base_url + entry['path'])}</loc>"
+                     f"<lastmod>{entry['date'] or entry['modified']}</lastmod></url>")
+    lines.append("</urlset>")
+    return "\n".join(lines) + "\n"
+
+def rss_xml(entries, base_url, site_title):
+    dated = sorted((entry for entry in entries.values() if entry["date"]),
+                   key=lambda entry: (entry["date"], entry["path"]), reverse=True)
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<rss version="2.0"><channel>',
+             f"<title>{escape(site_title)}</title>",
+             f"<link>{escape(base_url + '/')}</link>",
+             f"<description>{escape(site_title)}</description>"]
+    for entry in dated[:feed_size]:
+        published = datetime.datetime.fromisoformat(entry["date"]).replace(tzinfo=datetime.timezone.utc)
+        lines.append(f"<item><title>{escape(entry['title'])}</title>"
+                     f"<link>{escape(base_url + entry['path'])}</link>"
+                     f"<guid>{escape(base_url + entry['path'])}</guid>"
+                     f"<pubDate>{email.utils.format_datetime(published)}</pubDate>"
+                     f"<description>{escape(entry['summary'])}</description></item>")
+    lines.append("</channel></rss>")
+    return "\n".join(lines) + "\n"
+
+def section_children(entries):
+    #Maps each section URL without its own page to the pages and sections directly below it
+    paths = set(entry["path"] for entry in entries.values())
+    sections = {}
+    for entry in entries.values():
+        path = entry["path"]
+        child = entry
+        while path != "/":
+            parent = path[:path.rstrip("/").rfind("/") + 1]
+            if parent in paths:
+                break
+            sections.setdefault(parent, {})[path] = child
+            child = {"title": parent.strip("/").split("/")[-1], "path": parent, "date": None, "summary": ""}
+            path = parent
+    return {section: list(children.values()) for section, children in sections.items()}
+
+def section_node(children):
+    items = []
+    for entry in sorted(children, key=lambda entry: (entry["date"] or "", entry["path"]), reverse=True):
+        item = [LeafNode(entry["title"] or entry["path"], "a", {"href": entry["path"]})]
+        if entry["date"]:
+            item.append(LeafNode(f" ({entry['date']})"))
+        if entry["summary"]:
+            item.append(LeafNode(entry["summary"], "p"))
+        items.append(ParentNode(item, "li"))
+    return ParentNode([ParentNode(items, "ul")], "div")
+
+def write_site_indexes(pages, template_path, dest_dir_path, index_path, base_url):
+    entries = metadata_index(pages, dest_dir_path, index_path)
+    root = next((entry for entry in entries.values() if entry["path"] == "/"), None)
+    site_title = root["title"] if root is not None else ""
+    base_url = base_url.rstrip("/")
+
+    outputs = {os.path.join(dest_dir_path, "sitemap.xml"): sitemap_xml(entries, base_url),
+               os.path.join(dest_dir_path, "rss.xml"): rss_xml(entries, base_url, site_title)}
+    template = load_template(template_path)
+    sections = section_children(entries)
+    for section, children in sections.items():
+        title = section.strip("/").split("/")[-1] or site_title
+        outputs[os.path.join(dest_dir_path, *section.strip("/").split("/"), "index.html")] = \
+            (title, section_node(children))
+
+    written = 0
+    for path, output in outputs.items():
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if isinstance(output, str):
+            status = write_output(path, lambda f: f.write(output))
+        else:
+            status = write_output(path, lambda f: write_template(f, template, {"Title": output[0],
+                                                                               "Content": output[1]}))
+        written += status == "written"
+    print(f"Site indexes: sitemap, feed and {len(sections)} section pages ({written} rewritten)")
+    return set(os.path.normpath(path) for path in outputs)
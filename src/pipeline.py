@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import os
+import build
+from cache import active_cache
+from template import load_template, render_template
+from writer import write_output
+
+
+def read_markdown(from_path):
+    if os.path.getsize(from_path) > build.stream_threshold:
+        return None
+    with open(from_path, "r") as file:
+        return file.read()
+
+def render_uncached(md_contents, template, serialize):
+    content, title = build.parse_markdown(md_contents, serialize)
+    return content, title, render_template(template, {"Title": title, "Content": content})
+
+def write_page(target_path, html):
+    if not os.path.exists(target_path):
+        os.makedirs(target_path, exist_ok=True)
+    return write_output(os.path.join(target_path, "index.html"), lambda f: f.write(html))
+
+async def run_pipeline(units, template_path, readers, writers, queue_size):
+    template = load_template(template_path)
+    read_queue = asyncio.Queue(queue_size)
+    write_queue = asyncio.Queue(queue_size)
+    pending = iter(units)
+    statuses = {}
+    errors = {}
+
+    def fail(from_path, e):
+        errors[from_path] = f"{type(e).__name__}: {e}"
+
+    async def render(md_contents):
+        #The parse cache's sqlite connection belongs to this thread, so only parsing leaves it
+        cache = active_cache()
+        cached = cache.get(md_contents) if cache is not None else None
+        if cached is not None:
+            return render_template(template, {"Title": cached[1], "Content": cached[0]})
+        content, title, html = await asyncio.to_thread(render_uncached, md_contents, template, cache is not None)
+        if cache is not None:
+            cache.put(md_contents, content, title)
+        return html
+
+    async def write(items):
+        for from_path, target_path, html in items:
+            try:
+                statuses[from_path] = await asyncio.to_thread(write_page, target_path, html)
+            except Exception as e:
+                fail(from_path, e)
+
+    async def reader():
+        #Units are pages sharing a target directory; they travel together to keep their order
+        for unit in pending:
+            items = []
+            for from_path, target_path in unit:
+                try:
+                    md_contents = await asyncio.to_thread(read_markdown, from_path)
+                except Exception as e:
+                    fail(from_path, e)
+                    continue
+                items.append((from_path, target_path, md_contents))
+            await read_queue.put(items)
+
+    async def renderer():
+        while True:
+            items = await read_queue.get()
+            if items is None:
+                break
+            rendered = []
+            for from_path, target_path, md_contents in items:
+                try:
+                    if md_contents is None:
+                        #Too large to hold in memory; generate_page streams it from disk. Earlier
+                        #pages of the unit are written first so the last page still wins
+                        await write(rendered)
+                        rendered = []
+                        statuses[from_path] = await asyncio.to_thread(build.generate_page, from_path,
+                                                                      template_path, target_path)
+                        continue
+                    print(f"Generating page from {from_path} to {target_path} using {template_path}")
+                    logging.info(f"Generating page from {from_path} to {target_path} using {template_path}")
+                    html = await render(md_contents)
+                except Exception as e:
+                    fail(from_path, e)
+                    continue
+                rendered.append((from_path, target_path, html))
+            await write_queue.put(rendered)
+        for _ in range(writers):
+            await write_queue.put(None)
+
+    async def writer():
+        while True:
+            items = await write_queue.get()
+            if items is None:
+                return
+            await write(items)
+
+    reader_tasks = [asyncio.create_task(reader()) for _ in range(readers)]
+    render_task = asyncio.create_task(renderer())
+    writer_tasks = [asyncio.create_task(writer()) for _ in range(writers)]
+
+    await asyncio.gather(*reader_tasks)
+    await read_queue.put(None)
+    await render_task
+    await asyncio.gather(*writer_tasks)
+    return statuses, errors
+
+def generate_pages_async(units, template_path, readers=8, writers=8, queue_size=32):
+    return asyncio.run(run_pipeline(units, template_path, readers, writers, queue_size))
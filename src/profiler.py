@@ -0,0 +1,124 @@
+import contextlib
+import json
+import os
+import time
+
+#Set by start_profiling(); while it is None every phase is a shared no-op context
+active_profiler = None
+null_phase = contextlib.nullcontext()
+
+
+class Profiler:
+    def __init__(self):
+        self.phases = {}
+        self.block_types = {}
+        self.pages = {}
+        self.current_page = None
+
+    def record(self, table, name, wall, cpu):
+        entry = table.get(name)
+        if entry is None:
+            entry = table[name] = [0.0, 0.0, 0]
+        entry[0] += wall
+        entry[1] += cpu
+        entry[2] += 1
+
+    @contextlib.contextmanager
+    def timed(self, table, name, per_page=True):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            self.record(table, name, wall, cpu)
+            if per_page and self.current_page is not None:
+                self.record(self.pages[self.current_page]["phases"], name, wall, cpu)
+
+    def phase(self, name):
+        return self.timed(self.phases, name)
+
+    def block_phase(self, block_type):
+        return self.timed(self.block_types, block_type, per_page=False)
+
+    @contextlib.contextmanager
+    def page(self, path):
+        previous = self.current_page
+        self.current_page = path
+        self.pages[path] = {"phases": {}}
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.pages[path]["wall"] = time.perf_counter() - wall
+            self.pages[path]["cpu"] = time.process_time() - cpu
+            self.current_page = previous
+
+    def to_dict(self):
+        def table(entries):
+            return {name: {"wall": wall, "cpu": cpu, "count": count}
+                    for name, (wall, cpu, count) in entries.items()}
+
+        return {"phases": table(self.phases),
+                "block_types": table(self.block_types),
+                "pages": {path: {"wall": page["wall"],
+                                 "cpu": page["cpu"],
+                                 "phases": table(page["phases"])}
+                          for path, page in self.pages.items() if "wall" in page}}
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=1, sort_keys=True)
+
+    def slowest_pages(self, top):
+        pages = [(page["wall"], path) for path, page in self.pages.items() if "wall" in page]
+        pages.sort(reverse=True)
+        return pages[:top]
+
+    def report(self, top=10):
+        lines = [f"{'phase':<20} {'wall ms':>10} {'cpu ms':>10} {'count':>8}"]
+        for name, (wall, cpu, count) in sorted(self.phases.items(), key=lambda item: -item[1][0]):
+            lines.append(f"{name:<20} {wall * 1000:>10.1f} {cpu * 1000:>10.1f} {count:>8}")
+
+        lines.append("")
+        lines.append(f"{'block type':<20} {'wall ms':>10} {'cpu ms':>10} {'count':>8}")
+        for name, (wall, cpu, count) in sorted(self.block_types.items(), key=lambda item: -item[1][0]):
+            lines.append(f"{name:<20} {wall * 1000:>10.1f} {cpu * 1000:>10.1f} {count:>8}")
+
+        lines.append("")
+        lines.append(f"Top {top} slowest pages:")
+        for wall, path in self.slowest_pages(top):
+            lines.append(f"{wall * 1000:>10.1f} ms  {path}")
+        return "\n".join(lines)
+
+def start_profiling():
+    global active_profiler
+    active_profiler = Profiler()
+    return active_profiler
+
+def stop_profiling():
+    global active_profiler
+    profiler = active_profiler
+    active_profiler = None
+    return profiler
+
+def profiling():
+    return active_profiler is not None
+
+def phase(name):
+    if active_profiler is None:
+        return null_phase
+    return active_profiler.phase(name)
+
+def block_phase(block_type):
+    if active_profiler is None:
+        return null_phase
+    return active_profiler.block_phase(block_type)
+
+def page_phase(path):
+    if active_profiler is None:
+        return null_phase
+    return active_profiler.page(path)
@@ -0,0 +1,111 @@
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from build import find_pages
+from conversion import *
+from frontmatter import body_lines
+from manifest import hash_file
+from writer import page_url, save_json
+
+word_pattern = re.compile(r"\w+")
+#Postings per shard the index aims for; large sites are split so clients fetch only what they query
+shard_postings = 20000
+max_shards = 256
+search_version = 1
+
+
+def term_shard(term, shards):
+    #FNV-1a over UTF-8, easy to reproduce in the browser to find a term's shard
+    digest = 0x811c9dc5
+    for byte in term.encode():
+        digest = ((digest ^ byte) * 0x01000193) & 0xffffffff
+    return digest % shards
+
+def page_terms(from_path):
+    #A second tokenization pass over the markdown, separate from rendering: it also serves pages
+    #the build skipped, parse cache hits and merged shards, none of which produce TextNodes here
+    terms = {}
+    with open(from_path, "r") as file:
+        values, lines = body_lines(file)
+        title = values.get("title")
+        for block in iter_blocks(lines):
+            if title is None and block.startswith("# "):
+                title = block.split("\n")[0].lstrip("# ")
+            for node in block_textnodes(block):
+                for word in word_pattern.findall(node.text.lower()):
+                    terms[word] = terms.get(word, 0) + 1
+    return {"title": title or "", "terms": terms}
+
+def page_terms_batch(paths):
+    return [page_terms(path) for path in paths]
+
+def load_search_state(path):
+    try:
+        with open(path, "r") as file:
+            state = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(state, dict) or state.get("version") != search_version:
+        return {}
+    return state.get("pages", {})
+
+def index_pages(pages, state_path, jobs=1):
+    #pages is find_pages() output; only pages whose markdown changed are re-tokenized
+    old_pages = load_search_state(state_path)
+    entries = {}
+    stale = []
+    for from_path, target_path in pages:
+        source_hash = hash_file(from_path)
+        old_entry = old_pages.get(from_path)
+        if old_entry is not None and old_entry["hash"] == source_hash:
+            entries[from_path] = dict(old_entry, target=target_path)
+        else:
+            entries[from_path] = {"hash": source_hash, "target": target_path}
+            stale.append(from_path)
+
+    if jobs <= 1 or len(stale) <= 1:
+        results = [page_terms(from_path) for from_path in stale]
+    else:
+        chunk_size = max(1, min(64, len(stale) // (jobs * 4)))
+        batches = [stale[i:i + chunk_size] for i in range(0, len(stale), chunk_size)]
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = [result for batch in executor.map(page_terms_batch, batches) for result in batch]
+    for from_path, result in zip(stale, results):
+        entries[from_path].update(result)
+
+    save_json(state_path, {"version": search_version, "pages": entries}, compact=True)
+    return entries, len(stale)
+
+def build_shards(entries, dest_dir_path):
+    documents = []
+    postings = {}
+    for doc_id, from_path in enumerate(sorted(entries)):
+        entry = entries[from_path]
+        documents.append([page_url(entry["target"], dest_dir_path), entry["title"]])
+        for term, count in entry["terms"].items():
+            postings.setdefault(term, []).append([doc_id, count])
+
+    total = sum(len(docs) for docs in postings.values())
+    shards = max(1, min(max_shards, -(-total // shard_postings)))
+    shard_terms = [{} for _ in range(shards)]
+    for term in sorted(postings):
+        shard_terms[term_shard(term, shards)][term] = postings[term]
+    return {"version": search_version, "hash": "fnv1a32", "shards": shards, "documents": documents}, shard_terms
+
+def write_search_index(content_dir_path, dest_dir_path, state_path, jobs=1):
+    entries, indexed = index_pages(find_pages(content_dir_path, dest_dir_path), state_path, jobs)
+    index, shard_terms = build_shards(entries, dest_dir_path)
+
+    search_dir = os.path.join(dest_dir_path, "search")
+    outputs = {os.path.join(search_dir, "index.json"): index}
+    for shard, terms in enumerate(shard_terms):
+        outputs[os.path.join(search_dir, f"shard-{shard}.json")] = terms
+
+    written = 0
+    for path, data in outputs.items():
+        if save_json(path, data, compact=True) == "written":
+            written += 1
+    print(f"Search index: {indexed} pages indexed, {len(entries) - indexed} unchanged, "
+          f"{len(shard_terms)} shards ({written} rewritten)")
+    return set(os.path.normpath(path) for path in outputs)
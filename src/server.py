@@ -0,0 +1,229 @@
+import collections
+import email.utils
+import http.server
+import mimetypes
+import os
+import posixpath
+import re
+import threading
+import urllib.parse
+from stat import S_ISREG
+from compress import compressible
+from fingerprint import fingerprint_length
+
+#Files larger than this are streamed from disk instead of being kept in memory
+cache_max_file_bytes = 1024 * 1024
+#Preferred order of precompressed siblings written by compress.py
+encodings = (("br", ".br"), ("gzip", ".gz"))
+#name.<hash>.ext files from fingerprint.py never change, so clients may keep them for a year
+fingerprinted_pattern = re.compile(r"\.[0-9a-f]{%d}(\.[^./]+)?$" % fingerprint_length)
+
+
+class FileCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path, stat, file=None):
+        #Entries are keyed by path and validated against the current mtime and size; on a miss
+        #the body comes from file when given, the same open file stat was taken from
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry[0] == key:
+                self.entries.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        if file is None:
+            with open(path, "rb") as file:
+                body = file.read()
+        else:
+            body = file.read()
+        if len(body) <= cache_max_file_bytes and len(body) <= self.max_bytes:
+            self.put(path, key, body)
+        return body
+
+    def put(self, path, key, body):
+        with self.lock:
+            old = self.entries.pop(path, None)
+            if old is not None:
+                self.size -= len(old[1])
+            self.entries[path] = (key, body)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+class StaticHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "StaticSiteGen"
+    #Headers and body leave in one segment rather than waiting on a delayed ACK
+    wbufsize = 1 << 16
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_file(head=False)
+
+    def do_HEAD(self):
+        self.send_file(head=True)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def translate_path(self, url_path):
+        path = posixpath.normpath(urllib.parse.unquote(url_path.split("?", 1)[0].split("#", 1)[0]))
+        parts = [part for part in path.split("/") if part and part not in (".", "..")]
+        return os.path.join(self.server.root, *parts)
+
+    def accepted_encodings(self):
+        accepted = set()
+        for item in self.headers.get("Accept-Encoding", "").split(","):
+            name, _, params = item.partition(";")
+            params = params.replace(" ", "")
+            if params.startswith("q="):
+                try:
+                    if float(params[2:]) == 0:
+                        continue
+                except ValueError:
+                    continue
+            accepted.add(name.strip().lower())
+        return accepted
+
+    def open_variant(self, path):
+        #Opens the file to send and stats the open descriptor, so headers and body always agree
+        #even if a rebuild replaces the file meanwhile; None when there is no such file
+        try:
+            file = open(path, "rb")
+        except OSError:
+            return None
+        stat = os.fstat(file.fileno())
+        if not S_ISREG(stat.st_mode):
+            file.close()
+            return None
+        if not compressible(path):
+            return file, stat, None
+
+        #Use a precompressed sibling only while it still matches its source's mtime
+        accepted = self.accepted_encodings()
+        for encoding, suffix in encodings:
+            if encoding not in accepted:
+                continue
+            try:
+                variant = open(path + suffix, "rb")
+            except OSError:
+                continue
+            variant_stat = os.fstat(variant.fileno())
+            if variant_stat.st_mtime_ns == stat.st_mtime_ns:
+                file.close()
+                return variant, variant_stat, encoding
+            variant.close()
+        return file, stat, None
+
+    def not_modified(self, etag, mtime):
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is not None:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            return int(mtime) <= since.timestamp()
+        return False
+
+    def send_error_page(self, code, message):
+        body = f"<h1>{code} {message}</h1>".encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def send_file(self, head):
+        url_path = self.path.split("?", 1)[0]
+        path = self.translate_path(url_path)
+        if os.path.isdir(path):
+            if not url_path.endswith("/"):
+                self.send_response(301)
+                self.send_header("Location", url_path + "/")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            path = os.path.join(path, "index.html")
+
+        opened = self.open_variant(path)
+        if opened is None:
+            self.send_error_page(404, "Not Found")
+            return
+        file, stat, encoding = opened
+        with file:
+            self.send_opened(path, file, stat, encoding, head)
+
+    def send_cache_headers(self, path):
+        #Sent with 304s too, which must repeat the caching headers of the 200 they stand for
+        if fingerprinted_pattern.search(path):
+            self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+        else:
+            self.send_header("Cache-Control", "no-cache")
+        if compressible(path):
+            self.send_header("Vary", "Accept-Encoding")
+
+    def send_opened(self, path, file, stat, encoding, head):
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if content_type.startswith("text/"):
+            content_type += "; charset=utf-8"
+
+        if self.not_modified(etag, stat.st_mtime):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_cache_headers(path)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(stat.st_size))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", email.utils.formatdate(stat.st_mtime, usegmt=True))
+        self.send_cache_headers(path)
+        if encoding is not None:
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        if head:
+            return
+
+        if stat.st_size <= cache_max_file_bytes:
+            self.wfile.write(self.server.cache.get(file.name, stat, file))
+        else:
+            while chunk := file.read(1 << 16):
+                self.wfile.write(chunk)
+
+
+class StaticServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, root, cache_bytes=64 * 1024 * 1024, verbose=False):
+        super().__init__(address, StaticHandler)
+        self.root = os.path.abspath(root)
+        self.cache = FileCache(cache_bytes)
+        self.verbose = verbose
+
+
+def start_server(dest_dir, port, cache_bytes=64 * 1024 * 1024, host="", verbose=False):
+    server = StaticServer((host, port), dest_dir, cache_bytes, verbose)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,131 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+from conversion import converter_version
+from fingerprint import assets_digest
+from manifest import hash_file
+from sync import copy_file, files_match
+from writer import save_json
+
+shard_dir_pattern = re.compile(r"^(\d+)-of-(\d+)$")
+
+
+def parse_shard(text):
+    match = re.fullmatch(r"(\d+)/(\d+)", text)
+    if match is None:
+        raise argparse.ArgumentTypeError(f"expected i/N, got {text!r}")
+    index, count = int(match.group(1)), int(match.group(2))
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard {text} is out of range, i must be between 1 and N")
+    return index, count
+
+def page_shard(from_path, dir_path_content, count):
+    #Pages sharing a directory share a target, so the directory decides the shard and
+    #the last-one-wins order inside it never spans two machines
+    relative = os.path.relpath(os.path.dirname(from_path), dir_path_content).replace(os.sep, "/")
+    digest = hashlib.sha256(relative.encode()).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+def shard_pages(pages, dir_path_content, index, count):
+    return [(from_path, dest_path) for from_path, dest_path in pages
+            if page_shard(from_path, dir_path_content, count) == index]
+
+def shard_dir(shards_dir, index, count):
+    return os.path.join(shards_dir, f"{index}-of-{count}")
+
+def shard_inputs(template_path):
+    #Everything besides the pages themselves that changes what a shard renders
+    return {"template": hash_file(template_path), "assets": assets_digest(), "converter": converter_version}
+
+def page_hashes(pages, dir_path_content):
+    return {os.path.relpath(from_path, dir_path_content).replace(os.sep, "/"): hash_file(from_path)
+            for from_path, _ in pages}
+
+def finish_shard(path, index, count, pages, dir_path_content, template_path):
+    #Written last, so merge can tell a finished shard from one still building
+    save_json(os.path.join(path, "shard.json"), {"index": index, "count": count,
+                                                 "inputs": shard_inputs(template_path),
+                                                 "pages": page_hashes(pages, dir_path_content)})
+
+def find_shards(shards_dir, count=None):
+    found = {}
+    if os.path.isdir(shards_dir):
+        for name in sorted(os.listdir(shards_dir)):
+            match = shard_dir_pattern.match(name)
+            if match is not None:
+                found.setdefault(int(match.group(2)), []).append(int(match.group(1)))
+
+    if count is None:
+        if len(found) != 1:
+            raise Exception(f"Expected shards of one build in {shards_dir}, found counts {sorted(found) or 'none'}")
+        count = next(iter(found))
+
+    paths = []
+    for index in range(1, count + 1):
+        path = shard_dir(shards_dir, index, count)
+        if not os.path.exists(os.path.join(path, "shard.json")):
+            raise Exception(f"Shard {index}/{count} has not finished building in {path}")
+        paths.append(path)
+    return paths
+
+def verify_shards(shard_dirs, pages, dir_path_content, template_path):
+    #Every page of this build must come from exactly one shard that rendered its current source
+    #with the current template, asset map and converter; leftovers from older runs are refused
+    inputs = shard_inputs(template_path)
+    expected = page_hashes(pages, dir_path_content)
+    owners = {}
+    problems = []
+    for shard in shard_dirs:
+        with open(os.path.join(shard, "shard.json"), "r") as file:
+            info = json.load(file)
+        if info.get("inputs") != inputs:
+            problems.append(f"{shard} was built with a different template, asset map or converter")
+        for page, digest in info.get("pages", {}).items():
+            if page in owners:
+                problems.append(f"{page} was rendered by both {owners[page]} and {shard}")
+            elif page not in expected:
+                problems.append(f"{page} was rendered by {shard} but is no longer a page")
+            elif digest != expected[page]:
+                problems.append(f"{page} changed after {shard} rendered it")
+            owners.setdefault(page, shard)
+    problems.extend(f"{page} was not rendered by any shard" for page in sorted(expected) if page not in owners)
+
+    for problem in problems:
+        print(f"Stale shards: {problem}")
+    if problems:
+        raise Exception(f"{len(problems)} problems with the shards; rebuild them before merging")
+
+def merge_shards(shard_dirs, dest_dir_path, reserved=(), hardlink=False):
+    #reserved holds paths already owned by static files; a page landing on one is a collision
+    owners = {os.path.normpath(path): "static" for path in reserved}
+    sources = {}
+    collisions = []
+    for shard in shard_dirs:
+        public = os.path.join(shard, "public")
+        for root, _, files in os.walk(public):
+            for name in files:
+                from_path = os.path.join(root, name)
+                dest_path = os.path.normpath(os.path.join(dest_dir_path, os.path.relpath(from_path, public)))
+                if dest_path in owners:
+                    collisions.append((dest_path, owners[dest_path], shard))
+                    continue
+                owners[dest_path] = shard
+                sources[dest_path] = from_path
+
+    for dest_path, first, second in collisions:
+        print(f"Collision on {dest_path}: written by {first} and {second}")
+    if collisions:
+        raise Exception(f"{len(collisions)} files collide across shards")
+
+    counts = {"written": 0, "skipped": 0}
+    for dest_path, from_path in sorted(sources.items()):
+        if files_match(from_path, dest_path):
+            counts["skipped"] += 1
+            continue
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        copy_file(from_path, dest_path, hardlink)
+        counts["written"] += 1
+    print(f"Merged {len(shard_dirs)} shards: {counts['written']} copied, {counts['skipped']} unchanged")
+    return counts, set(sources)
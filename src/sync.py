@@ -0,0 +1,101 @@
+import os
+import shutil
+from manifest import hash_file
+
+#Linux ioctl that clones file extents on copy-on-write filesystems (btrfs, xfs)
+FICLONE = 0x40049409
+
+
+def files_match(from_path, dest_path, checksum=False):
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        return False
+    from_stat = os.stat(from_path)
+
+    if from_stat.st_size != dest_stat.st_size:
+        return False
+    if checksum:
+        return hash_file(from_path) == hash_file(dest_path)
+    return from_stat.st_mtime_ns == dest_stat.st_mtime_ns
+
+def clone_file(from_path, dest_path):
+    with open(from_path, "rb") as source, open(dest_path, "wb") as dest:
+        try:
+            import fcntl
+            fcntl.ioctl(dest.fileno(), FICLONE, source.fileno())
+            return
+        except (ImportError, OSError):
+            pass
+
+        if hasattr(os, "copy_file_range"):
+            try:
+                remaining = os.fstat(source.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(source.fileno(), dest.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+                if remaining == 0:
+                    return
+            except OSError:
+                pass
+            source.seek(0)
+            dest.seek(0)
+            dest.truncate()
+
+        shutil.copyfileobj(source, dest, 1 << 20)
+
+def copy_file(from_path, dest_path, hardlink=False):
+    if os.path.lexists(dest_path):
+        os.remove(dest_path)
+
+    if hardlink:
+        try:
+            os.link(from_path, dest_path)
+            return
+        except OSError:
+            pass
+
+    clone_file(from_path, dest_path)
+    #Carry the mtime over so the next sync can compare it
+    shutil.copystat(from_path, dest_path)
+
+def sync_tree(source_dir_path, dest_dir_path, checksum=False, hardlink=False):
+    synced = set()
+    copied = 0
+
+    for root, dirs, files in os.walk(source_dir_path):
+        dirs.sort()
+        dest_root = os.path.join(dest_dir_path, os.path.relpath(root, source_dir_path))
+        if not os.path.isdir(dest_root):
+            os.makedirs(dest_root)
+
+        for filename in sorted(files):
+            from_path = os.path.join(root, filename)
+            dest_path = os.path.normpath(os.path.join(dest_root, filename))
+            synced.add(dest_path)
+            if files_match(from_path, dest_path, checksum):
+                continue
+            print(f" * {from_path} -> {dest_path}")
+            copy_file(from_path, dest_path, hardlink)
+            copied += 1
+
+    print(f"Synced static files: {copied} copied, {len(synced) - copied} unchanged")
+    return synced
+
+def prune_tree(dest_dir_path, keep):
+    keep = set(os.path.normpath(path) for path in keep)
+    removed = 0
+
+    for root, dirs, files in os.walk(dest_dir_path, topdown=False):
+        for filename in files:
+            path = os.path.normpath(os.path.join(root, filename))
+            if path not in keep:
+                print(f"Removing stale {path}")
+                os.remove(path)
+                removed += 1
+        if os.path.normpath(root) != os.path.normpath(dest_dir_path) and not os.listdir(root):
+            os.rmdir(root)
+
+    return removed
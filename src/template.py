@@ -0,0 +1,56 @@
+import os
+import re
+from fingerprint import assets_digest, rewrite_urls
+
+placeholder_pattern = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+#Compiled templates keyed by path, reused until the file's mtime or size or the asset map changes
+template_cache = {}
+
+
+def compile_template(template):
+    #Literal segments sit at even indices, (name, placeholder) slots at odd indices
+    segments = []
+    position = 0
+    for match in placeholder_pattern.finditer(template):
+        segments.append(template[position:match.start()])
+        segments.append((match.group(1), match.group(0)))
+        position = match.end()
+    segments.append(template[position:])
+    return segments
+
+def load_template(template_path):
+    stat = os.stat(template_path)
+    key = (stat.st_mtime_ns, stat.st_size, assets_digest())
+    cached = template_cache.get(template_path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    with open(template_path, "r") as file:
+        compiled = compile_template(rewrite_urls(file.read()))
+    template_cache[template_path] = (key, compiled)
+    return compiled
+
+def render_template(compiled, values):
+    parts = []
+    for i in range(0, len(compiled)):
+        if i % 2 == 0:
+            parts.append(compiled[i])
+            continue
+        name, placeholder = compiled[i]
+        value = values.get(name, placeholder)
+        parts.append(value if isinstance(value, str) else value.to_html())
+    return "".join(parts)
+
+def write_template(file, compiled, values):
+    #Values are strings or HTML nodes; nodes are streamed straight into the file
+    for i in range(0, len(compiled)):
+        if i % 2 == 0:
+            file.write(compiled[i])
+            continue
+        name, placeholder = compiled[i]
+        value = values.get(name, placeholder)
+        if isinstance(value, str):
+            file.write(value)
+        else:
+            value.write_html(file)
@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+
+import cache
+from cache import ParseCache, active_cache, enable_cache
+
+
+class ParseCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "cache", "parse_cache.sqlite")
+
+    def test_round_trip(self):
+        parse_cache = ParseCache(self.path, 1024)
+        self.assertIsNone(parse_cache.get("# Title"))
+        parse_cache.put("# Title", "<div><h1>Title</h1></div>", "Title")
+        parse_cache.close()
+
+        parse_cache = ParseCache(self.path, 1024)
+        self.assertEqual(parse_cache.get("# Title"), ("<div><h1>Title</h1></div>", "Title"))
+        self.assertEqual((parse_cache.hits, parse_cache.misses), (1, 0))
+        parse_cache.close()
+
+    def test_version_is_part_of_key(self):
+        parse_cache = ParseCache(self.path, 1024)
+        key = parse_cache.key("# Title")
+        old_version = cache.converter_version
+        cache.converter_version = old_version + "-next"
+        self.addCleanup(setattr, cache, "converter_version", old_version)
+        self.assertNotEqual(parse_cache.key("# Title"), key)
+        parse_cache.close()
+
+    def test_evicts_least_recently_used(self):
+        parse_cache = ParseCache(self.path, 30)
+        parse_cache.put("a", "x" * 10, "a")
+        parse_cache.flush()
+        parse_cache.put("b", "y" * 10, "b")
+        parse_cache.flush()
+        parse_cache.get("a")
+        parse_cache.put("c", "z" * 10, "c")
+
+        self.assertEqual(parse_cache.evict(), 1)
+        self.assertIsNone(parse_cache.get("b"))
+        self.assertIsNotNone(parse_cache.get("a"))
+        self.assertIsNotNone(parse_cache.get("c"))
+        parse_cache.close()
+
+    def test_active_cache_is_per_process(self):
+        self.addCleanup(setattr, cache, "cache_settings", None)
+        self.addCleanup(cache.close_cache)
+        self.assertIsNone(active_cache())
+        enable_cache(self.path, 1024)
+        self.assertIs(active_cache(), active_cache())
+
+if __name__ == "__main__":
+    unittest.main()
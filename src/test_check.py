@@ -0,0 +1,64 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from build import find_pages
+from check import check_site, page_links, resolve_url, site_index
+from testutil import write_file
+
+
+class ResolveUrl(unittest.TestCase):
+    def test_resolve(self):
+        self.assertEqual(resolve_url("/blog/?page=2#top", "/"), "/blog/")
+        self.assertEqual(resolve_url("../images/a%20b.png", "/blog/post/"), "/blog/images/a b.png")
+        self.assertEqual(resolve_url("post", "/blog/"), "/blog/post")
+        self.assertIsNone(resolve_url("https://example.com/", "/"))
+        self.assertIsNone(resolve_url("mailto:frodo@shire.me", "/"))
+        self.assertIsNone(resolve_url("#heading", "/"))
+
+    def test_site_index(self):
+        index = site_index(["/public/index.html", "/public/blog/index.html", "/public/index.css"], "/public")
+        self.assertEqual(index, {"/index.html", "/", "/blog/index.html", "/blog/", "/blog", "/index.css"})
+
+    def test_page_links_match_textnodes(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "index.md")
+            write_file(path, "# Home\n\n[![badge](/badge.png)](/about) and [next](/next)\n\n```\n[code](/x)\n```")
+            self.assertEqual(page_links(path), [("image", "/badge.png"), ("link", "/next"),
+                                                ("link", "/x")])
+
+
+class CheckSite(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.content = os.path.join(self.tmp.name, "content")
+        self.public = os.path.join(self.tmp.name, "public")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        write_file(self.template, '<link href="/index.css">{{ Content }}')
+        write_file(os.path.join(self.content, "index.md"),
+                   "# Home\n\n[Blog](/blog) ![logo](/images/logo.png) [gone](/gone/)")
+        write_file(os.path.join(self.content, "blog", "index.md"), "# Blog\n\n[home](../) [missing](missing.png)")
+
+    def check(self, jobs=1):
+        pages = find_pages(self.content, self.public)
+        paths = [os.path.join(self.public, "index.css"), os.path.join(self.public, "images", "logo.png")]
+        paths += [os.path.join(dest_path, "index.html") for _, dest_path in pages]
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            broken = check_site(pages, self.template, paths, self.public, jobs)
+        return broken, out.getvalue()
+
+    def test_reports_broken_links_and_images(self):
+        broken, out = self.check()
+        self.assertEqual(sorted(broken), [(os.path.join(self.content, "blog", "index.md"), "link", "missing.png"),
+                                          (os.path.join(self.content, "index.md"), "link", "/gone/")])
+        self.assertIn("Checked 6 links and images in 2 pages: 2 broken", out)
+
+    def test_parallel_matches_serial(self):
+        self.assertEqual(sorted(self.check(jobs=2)[0]), sorted(self.check()[0]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from compress import compress_file, compress_tree, compressed_siblings, compressed_suffixes
+from sync import prune_tree
+from testutil import write_file
+
+
+class CompressTree(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.page = os.path.join(self.tmp.name, "blog", "index.html")
+        self.css = os.path.join(self.tmp.name, "index.css")
+        self.image = os.path.join(self.tmp.name, "logo.png")
+        write_file(self.page, "<p>hello</p>" * 100)
+        write_file(self.css, "body {}")
+        write_file(self.image, "png")
+
+    def test_writes_siblings_for_html_and_css(self):
+        compress_tree([self.page, self.css, self.image])
+        with gzip.open(self.page + ".gz", "rt") as file:
+            self.assertEqual(file.read(), "<p>hello</p>" * 100)
+        self.assertTrue(os.path.exists(self.css + ".gz"))
+        self.assertFalse(os.path.exists(self.image + ".gz"))
+
+    def test_up_to_date_siblings_are_skipped(self):
+        self.assertEqual(compress_file(self.page), len(compressed_suffixes()))
+        self.assertEqual(compress_file(self.page), 0)
+
+        write_file(self.page, "<p>changed</p>")
+        os.utime(self.page, ns=(0, os.stat(self.page).st_mtime_ns + 1))
+        self.assertEqual(compress_file(self.page), len(compressed_suffixes()))
+        with gzip.open(self.page + ".gz", "rt") as file:
+            self.assertEqual(file.read(), "<p>changed</p>")
+
+    def test_parallel_matches_serial(self):
+        compress_tree([self.page, self.css], jobs=2)
+        with gzip.open(self.css + ".gz", "rt") as file:
+            self.assertEqual(file.read(), "body {}")
+
+    def test_prune_keeps_siblings(self):
+        compress_tree([self.page, self.css])
+        keep = {self.page, self.css, self.image}
+        self.assertEqual(prune_tree(self.tmp.name, keep.union(compressed_siblings(keep))), 0)
+        self.assertTrue(os.path.exists(self.page + ".gz"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,10 +3,13 @@ from conversion import textnode_to_htmlnode, split_nodes_delimiter, \
                   split_nodes_image, split_nodes_link, text_to_textnodes, \
                   markdown_to_blocks, block_to_block_type, markdown_to_html_node, \
                   block_type_paragraph, block_type_heading, block_type_code, \
-                  block_type_olist, block_type_ulist, block_type_quote
+                  block_type_olist, block_type_ulist, block_type_quote, \
+                  inline_cache_stats, clear_inline_cache, iter_blocks, iter_markdown_html, \
+                  classify_block
 from htmlnode import LeafNode, ParentNode, HTMLNode
 from textnode import TextNode
 
+import io
 import unittest
 
 class ConvertNode(unittest.TestCase):
@@ -198,6 +201,36 @@ class TextToTextNodes(unittest.TestCase):
                     ]
         self.assertEqual(textnodes, expected)
 
+    def test_all_inline_types(self):
+        text = "This is **text** with an *italic* word and a `code block` and an ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)"
+        expected = [
+                    TextNode("This is ", "text"),
+                    TextNode("text", "bold"),
+                    TextNode(" with an ", "text"),
+                    TextNode("italic", "italic"),
+                    TextNode(" word and a ", "text"),
+                    TextNode("code block", "code"),
+                    TextNode(" and an ", "text"),
+                    TextNode("obi wan image", "image", "https://i.imgur.com/fJRm4Vk.jpeg"),
+                    TextNode(" and a ", "text"),
+                    TextNode("link", "link", "https://boot.dev"),
+                    ]
+        self.assertEqual(text_to_textnodes(text), expected)
+
+    def test_matches_chained_passes(self):
+        texts = ["[![badge](https://img.shields.io/b.svg)](https://boot.dev) **bold [link](/a) more",
+                 "*a **b** c* and `x*y*z` with an unclosed **bold",
+                 "[a](/1)[b](/2)![c](/3.png)[d](/4) trailing *text*"]
+        for text in texts:
+            nodes = split_nodes_link(split_nodes_image([TextNode(text, "text")]))
+            for delimiter in ["**", "*", "`"]:
+                nodes = split_nodes_delimiter(nodes, delimiter)
+            self.assertEqual(text_to_textnodes(text), nodes)
+
+    def test_empty_delimiters_are_dropped(self):
+        self.assertEqual(text_to_textnodes("a****b``"),
+                         [TextNode("a", "text"), TextNode("b", "text")])
+
 class MarkdownToBlocks(unittest.TestCase):
     def test_given_example(self):
         markdown = """# This is a heading
@@ -244,6 +277,25 @@ class MarkdownToBlocks(unittest.TestCase):
         expected = ["# Just a single line with no blank lines."]
         self.assertEqual(blocks, expected)
 
+class IterBlocks(unittest.TestCase):
+    markdown = "# Heading\n\nParagraph one\nstill one\n\n```\ncode\n\nmore code\n```\n\n* a\n* b\n"
+
+    def test_matches_markdown_to_blocks(self):
+        self.assertEqual(list(iter_blocks(io.StringIO(self.markdown))), markdown_to_blocks(self.markdown))
+        self.assertEqual(markdown_to_blocks(self.markdown),
+                         ["# Heading", "Paragraph one\nstill one", "```\ncode\n\nmore code\n```", "* a\n* b"])
+
+    def test_is_lazy(self):
+        def lines():
+            yield "first block\n"
+            yield "\n"
+            raise AssertionError("read past the first block")
+        self.assertEqual(next(iter_blocks(lines())), "first block")
+
+    def test_streamed_html_matches_tree(self):
+        html = "".join(iter_markdown_html(io.StringIO(self.markdown)))
+        self.assertEqual(html, markdown_to_html_node(self.markdown).to_html())
+
 class BlockToBlockType(unittest.TestCase):
     def test_all_types(self):
         blocks = ["Hello World!",
@@ -278,6 +330,13 @@ class BlockToBlockType(unittest.TestCase):
 
     #     self.assertEqual(results, expected)
 
+    def test_classify_returns_lines(self):
+        self.assertEqual(classify_block("1. one\n2. two"), (block_type_olist, ["1. one", "2. two"]))
+        self.assertEqual(classify_block("- a\n* b"), (block_type_paragraph, ["- a", "* b"]))
+        self.assertEqual(classify_block("###### six")[0], block_type_heading)
+        self.assertEqual(classify_block("####### seven")[0], block_type_paragraph)
+        self.assertEqual(classify_block("**bold** start")[0], block_type_paragraph)
+
     def test_long_number_text(self):
         block = "100 Reasons not to leave your house"
         expected = "paragraph"
@@ -441,6 +500,28 @@ this is paragraph text
             "<div><blockquote>This is a blockquote block</blockquote><p>this is paragraph text</p></div>",
         )
 
+class InlineCache(unittest.TestCase):
+    def setUp(self):
+        clear_inline_cache()
+        self.addCleanup(clear_inline_cache)
+
+    def test_repeated_fragments_hit_cache(self):
+        md = "* [Home](/) | [About](/about)\n* *same item*\n\n* *same item*\n\n[Home](/) | [About](/about)"
+        first = markdown_to_html_node(md).to_html()
+        stats = inline_cache_stats()
+        self.assertEqual(stats["misses"], 2)
+        self.assertEqual(stats["hits"], 2)
+
+        self.assertEqual(markdown_to_html_node(md).to_html(), first)
+        self.assertEqual(inline_cache_stats()["hits"], 6)
+        self.assertAlmostEqual(inline_cache_stats()["hit_rate"], 6 / 8)
+
+    def test_nodes_are_not_shared(self):
+        first = markdown_to_html_node("[Home](/)")
+        second = markdown_to_html_node("[Home](/)")
+        first.children[0].children[0].props["href"] = "/changed"
+        self.assertEqual(second.to_html(), "<div><p><a href='/'>Home</a></p></div>")
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,152 @@
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+import cache
+from build import incremental_build
+from devserver import Inotify, SiteWatcher, diff_tree, scan_tree
+from testutil import write_file, read_file
+
+
+class ScanTree(unittest.TestCase):
+    def test_diff(self):
+        old = {"a": (1, 1), "b": (1, 1), "c": (1, 1)}
+        new = {"a": (1, 1), "b": (2, 1), "d": (1, 1)}
+        self.assertEqual(diff_tree(old, new), (["b", "d"], ["c"]))
+
+    def test_scan_missing_path(self):
+        self.assertEqual(scan_tree("/nonexistent/path"), {})
+
+class WatchRebuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.public = os.path.join(root, "public")
+        self.template = os.path.join(root, "template.html")
+        self.manifest = os.path.join(root, ".build", "manifest.json")
+        write_file(self.template, "{{ Title }}|{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home")
+        write_file(os.path.join(self.content, "blog", "index.md"), "# Blog")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        incremental_build(self.content, self.template, self.public, self.manifest)
+        self.watcher = SiteWatcher(self.content, self.static, self.template, self.public, self.manifest)
+
+    def test_no_changes(self):
+        self.assertEqual(self.watcher.poll(), 0)
+
+    def test_edited_page_is_rebuilt_alone(self):
+        write_file(os.path.join(self.public, "blog", "index.html"), "untouched")
+        write_file(os.path.join(self.content, "index.md"), "# Home again")
+
+        self.assertEqual(self.watcher.poll(), 1)
+        self.assertEqual(read_file(os.path.join(self.public, "index.html")),
+                         "Home again|<div><h1>Home again</h1></div>")
+        self.assertEqual(read_file(os.path.join(self.public, "blog", "index.html")), "untouched")
+
+    def test_template_change_rebuilds_all_pages(self):
+        write_file(self.template, "<b>{{ Title }}</b>")
+        self.assertEqual(self.watcher.poll(), 2)
+        self.assertEqual(read_file(os.path.join(self.public, "blog", "index.html")), "<b>Blog</b>")
+
+    def test_removed_page_and_assets(self):
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        write_file(os.path.join(self.static, "images", "logo.png"), "png")
+        self.watcher.poll()
+
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+        self.assertEqual(read_file(os.path.join(self.public, "images", "logo.png")), "png")
+
+        os.remove(os.path.join(self.static, "images", "logo.png"))
+        self.watcher.poll()
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images")))
+
+    def test_asset_change_rebuilds_dependents(self):
+        write_file(os.path.join(self.static, "logo.png"), "png")
+        write_file(os.path.join(self.content, "blog", "index.md"), "# Blog\n\n![logo](/logo.png)")
+        self.watcher.poll()
+        write_file(os.path.join(self.public, "index.html"), "untouched")
+        write_file(os.path.join(self.public, "blog", "index.html"), "untouched")
+
+        write_file(os.path.join(self.static, "logo.png"), "new png")
+        self.assertEqual(self.watcher.poll(), 2)
+        self.assertEqual(read_file(os.path.join(self.public, "index.html")), "untouched")
+        self.assertNotEqual(read_file(os.path.join(self.public, "blog", "index.html")), "untouched")
+
+    def test_pages_sharing_a_target_are_rebuilt_together(self):
+        write_file(os.path.join(self.content, "dup", "index.md"), "# First")
+        write_file(os.path.join(self.content, "dup", "z.md"), "# Second")
+        self.watcher.poll()
+        self.assertTrue(read_file(os.path.join(self.public, "dup", "index.html")).startswith("Second|"))
+
+        write_file(os.path.join(self.content, "dup", "index.md"), "# First edited")
+        self.watcher.poll()
+        self.assertTrue(read_file(os.path.join(self.public, "dup", "index.html")).startswith("Second|"))
+
+        os.remove(os.path.join(self.content, "dup", "z.md"))
+        self.watcher.poll()
+        self.assertTrue(read_file(os.path.join(self.public, "dup", "index.html")).startswith("First edited|"))
+
+    def test_only_reported_paths_are_restated(self):
+        write_file(os.path.join(self.content, "index.md"), "# Home again")
+        write_file(os.path.join(self.content, "blog", "index.md"), "# Blog again")
+        self.assertEqual(self.watcher.poll([os.path.join(self.content, "index.md")]), 1)
+        self.assertTrue(read_file(os.path.join(self.public, "blog", "index.html")).startswith("Blog|"))
+        self.assertEqual(self.watcher.poll(), 1)
+
+    def test_reported_directories_are_rescanned(self):
+        write_file(os.path.join(self.content, "new", "deep", "index.md"), "# Deep")
+        shutil.rmtree(os.path.join(self.content, "blog"))
+        self.watcher.poll([os.path.join(self.content, "new"), os.path.join(self.content, "blog")])
+        self.assertTrue(read_file(os.path.join(self.public, "new", "deep", "index.html")).startswith("Deep|"))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+        self.assertEqual(self.watcher.poll(), 0)
+
+    def test_rendered_pages_reach_the_parse_cache(self):
+        path = os.path.join(self.tmp.name, ".build", "parse_cache.sqlite")
+        self.addCleanup(setattr, cache, "cache_settings", None)
+        self.addCleanup(cache.close_cache)
+        cache.enable_cache(path, 1 << 20)
+        write_file(os.path.join(self.content, "index.md"), "# Home again")
+        self.watcher.poll()
+
+        connection = sqlite3.connect(path)
+        self.addCleanup(connection.close)
+        self.assertEqual(connection.execute("SELECT COUNT(*) FROM pages").fetchone()[0], 1)
+
+    def test_broken_page_keeps_watching(self):
+        write_file(os.path.join(self.content, "index.md"), "no heading")
+        self.assertEqual(self.watcher.poll(), 1)
+        write_file(os.path.join(self.content, "index.md"), "# Fixed it")
+        self.assertEqual(self.watcher.poll(), 1)
+        self.assertTrue(read_file(os.path.join(self.public, "index.html")).startswith("Fixed it|"))
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux only")
+class InotifyEvents(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.notifier = Inotify()
+        self.addCleanup(self.notifier.close)
+        self.notifier.add(self.tmp.name)
+
+    def test_saved_files_are_reported(self):
+        path = os.path.join(self.tmp.name, "index.md")
+        write_file(path, "# Home")
+        self.assertIn(path, self.notifier.read(1))
+        self.assertEqual(self.notifier.read(0), set())
+
+    def test_new_directories_are_watched(self):
+        directory = os.path.join(self.tmp.name, "blog")
+        os.makedirs(directory)
+        self.assertEqual(self.notifier.read(1), {directory})
+        write_file(os.path.join(directory, "index.md"), "# Blog")
+        self.assertIn(os.path.join(directory, "index.md"), self.notifier.read(1))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import build
+import fingerprint
+from conversion import markdown_to_html_node
+from fingerprint import asset_url, build_asset_map, disable_fingerprints, enable_fingerprints, \
+                        fingerprint_path, hash_assets, rewrite_urls, write_fingerprinted
+from template import load_template, render_template
+from testutil import write_file
+
+
+class HashAssets(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.static = os.path.join(self.tmp.name, "static")
+        self.cache = os.path.join(self.tmp.name, ".build", "asset_hashes.json")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        write_file(os.path.join(self.static, "images", "logo.png"), "png")
+
+    def test_unchanged_files_are_not_rehashed(self):
+        hashes = hash_assets(self.static, self.cache)
+        self.assertEqual(sorted(hashes), ["images/logo.png", "index.css"])
+
+        write_file(os.path.join(self.static, "index.css"), "body { color: red }")
+        with mock.patch("fingerprint.hash_file", wraps=fingerprint.hash_file) as hash_file:
+            updated = hash_assets(self.static, self.cache)
+        hash_file.assert_called_once_with(os.path.join(self.static, "index.css"))
+        self.assertEqual(updated["images/logo.png"], hashes["images/logo.png"])
+        self.assertNotEqual(updated["index.css"], hashes["index.css"])
+
+    def test_parallel_hashes_match_serial(self):
+        for i in range(8):
+            write_file(os.path.join(self.static, f"{i}.js"), str(i))
+        serial = hash_assets(self.static, self.cache)
+        os.remove(self.cache)
+        self.assertEqual(hash_assets(self.static, self.cache, jobs=2), serial)
+
+    def test_write_fingerprinted(self):
+        hashes = hash_assets(self.static, self.cache)
+        public = os.path.join(self.tmp.name, "public")
+        written = write_fingerprinted(self.static, public, hashes)
+        css = os.path.join(public, fingerprint_path("index.css", hashes["index.css"]))
+        self.assertIn(css, written)
+        with open(css) as file:
+            self.assertEqual(file.read(), "body {}")
+
+
+class RewriteUrls(unittest.TestCase):
+    def setUp(self):
+        enable_fingerprints(build_asset_map({"index.css": "0123456789abcdef",
+                                             "images/logo.png": "fedcba9876543210"}))
+        self.addCleanup(disable_fingerprints)
+
+    def test_asset_url(self):
+        self.assertEqual(asset_url("/index.css"), "/index.0123456789.css")
+        self.assertEqual(asset_url("/index.css?v=1#top"), "/index.0123456789.css?v=1#top")
+        self.assertEqual(asset_url("/missing.css"), "/missing.css")
+        self.assertEqual(asset_url("https://example.com/index.css"), "https://example.com/index.css")
+
+    def test_rewrite_urls(self):
+        self.assertEqual(rewrite_urls('<link href="/index.css"><img src=\'/images/logo.png\'>'),
+                         '<link href="/index.0123456789.css"><img src=\'/images/logo.fedcba9876.png\'>')
+
+    def test_markdown_links_and_images(self):
+        html = markdown_to_html_node("![logo](/images/logo.png) [style](/index.css)").to_html()
+        self.assertEqual(html, "<div><p><img src='/images/logo.fedcba9876.png' alt='logo'>Image</img> "
+                               "<a href='/index.0123456789.css'>style</a></p></div>")
+
+    def test_workers_receive_the_map(self):
+        mapping = fingerprint.fingerprint_map()
+        digest = fingerprint.assets_digest()
+        disable_fingerprints()
+        build.init_worker(None, mapping)
+        self.assertEqual(asset_url("/index.css"), "/index.0123456789.css")
+        self.assertEqual(fingerprint.assets_digest(), digest)
+
+    def test_template_is_recompiled_for_a_new_map(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "template.html")
+            write_file(path, '<link href="/index.css">{{ Content }}')
+            self.assertEqual(render_template(load_template(path), {"Content": ""}),
+                             '<link href="/index.0123456789.css">')
+            disable_fingerprints()
+            self.assertEqual(render_template(load_template(path), {"Content": ""}),
+                             '<link href="/index.css">')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import io
+import unittest
+
+from frontmatter import read_front_matter, split_front_matter
+
+
+class ReadFrontMatter(unittest.TestCase):
+    def test_header_is_consumed_and_body_left(self):
+        file = io.StringIO('---\ntitle: "Hello: world"\ndate: 2024-05-01\ndraft: true\n---\n# Body\n')
+        self.assertEqual(read_front_matter(file),
+                         ({"title": "Hello: world", "date": "2024-05-01", "draft": True}, None))
+        self.assertEqual(file.read(), "# Body\n")
+
+    def test_no_front_matter_returns_first_line(self):
+        file = io.StringIO("# Title\n\nBody")
+        self.assertEqual(read_front_matter(file), ({}, "# Title\n"))
+        self.assertEqual(file.read(), "\nBody")
+
+    def test_toml_style(self):
+        file = io.StringIO('+++\ntitle = "Hobbit = small"\ndraft = false\n+++\nBody')
+        self.assertEqual(read_front_matter(file), ({"title": "Hobbit = small", "draft": False}, None))
+
+    def test_split_front_matter(self):
+        self.assertEqual(split_front_matter("---\ndraft: true\n---\n# Title\n\nBody"),
+                         ({"draft": True}, "# Title\n\nBody"))
+        self.assertEqual(split_front_matter("# Title"), ({}, "# Title"))
+        self.assertEqual(split_front_matter("----\n# Title"), ({}, "----\n# Title"))
+
+    def test_unclosed_front_matter(self):
+        with self.assertRaises(ValueError):
+            read_front_matter(io.StringIO("---\ntitle: x\n# Body"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from htmlnode import HTMLNode, LeafNode, ParentNode
@@ -84,5 +85,41 @@ class TestHTMLNode(unittest.TestCase):
 
         self.assertEqual(node1.to_html(), node1_str)
 
+    def test_iter_html_chunks(self):
+        child = LeafNode("Hello World!", "b")
+        child1 = LeafNode("Click here.", "a", {"href": "https://www.google.com"})
+        node = ParentNode([ParentNode([child, child1], "p"), LeafNode("tail")], "div", {"id": "main"})
+        chunks = list(node.iter_html())
+
+        self.assertEqual(chunks[0], "<div id='main'>")
+        self.assertEqual(chunks[-1], "</div>")
+        self.assertEqual("".join(chunks), node.to_html())
+        self.assertEqual(node.to_html(),
+                         "<div id='main'><p><b>Hello World!</b><a href='https://www.google.com'>Click here.</a></p>tail</div>")
+
+    def test_write_html(self):
+        node = ParentNode([LeafNode("Hello", "b"), LeafNode(" World")], "p")
+        out = io.StringIO()
+        node.write_html(out)
+        self.assertEqual(out.getvalue(), "<p><b>Hello</b> World</p>")
+
+    def test_deeply_nested_parentnode(self):
+        node = LeafNode("deep", "span")
+        for _ in range(5000):
+            node = ParentNode([node], "div")
+        html = node.to_html()
+        self.assertTrue(html.startswith("<div><div>"))
+        self.assertEqual(len(html), 5000 * len("<div></div>") + len("<span>deep</span>"))
+
+    def test_slots(self):
+        for node in [HTMLNode("p"), LeafNode("x", "b"), ParentNode([LeafNode("x")], "p")]:
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_invalid_nested_parentnode(self):
+        inner = ParentNode([LeafNode("x")], "p")
+        inner.tag = None
+        with self.assertRaises(ValueError):
+            ParentNode([inner], "div").to_html()
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,350 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import build
+import cache
+import conversion
+import fingerprint
+
+from main import find_pages, incremental_build, generate_pages_recursive, write_manifest, \
+                 generate_pages
+from manifest import load_manifest
+from testutil import write_file, read_file
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+
+class SiteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.public = os.path.join(root, "public")
+        self.template = os.path.join(root, "template.html")
+        self.manifest = os.path.join(root, ".build", "manifest.json")
+        write_file(self.template, TEMPLATE)
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        write_file(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nPosts")
+
+    def output(self, *parts):
+        return os.path.join(self.public, *parts, "index.html")
+
+
+class FindPages(SiteTestCase):
+    def test_pages_and_targets(self):
+        pages = find_pages(self.content, self.public)
+        self.assertEqual(pages, [
+            (os.path.join(self.content, "blog", "index.md"), os.path.join(self.public, "blog")),
+            (os.path.join(self.content, "index.md"), self.public),
+        ])
+
+    def test_generate_pages_recursive(self):
+        generate_pages_recursive(self.content, self.template, self.public)
+        self.assertEqual(read_file(self.output()),
+                         "<title>Home</title><body><div><h1>Home</h1><p>Welcome</p></div></body>")
+        self.assertTrue(os.path.exists(self.output("blog")))
+
+    def test_unchanged_outputs_are_skipped(self):
+        counts = generate_pages_recursive(self.content, self.template, self.public)
+        self.assertEqual(counts, {"written": 2, "skipped": 0})
+        before = os.stat(self.output()).st_mtime_ns
+
+        write_file(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nNew post")
+        counts = generate_pages_recursive(self.content, self.template, self.public)
+        self.assertEqual(counts, {"written": 1, "skipped": 1})
+        self.assertEqual(os.stat(self.output()).st_mtime_ns, before)
+
+
+class ParallelBuild(SiteTestCase):
+    def test_matches_serial_output(self):
+        for i in range(20):
+            write_file(os.path.join(self.content, "posts", f"p{i}", "index.md"), f"# Post {i}\n\n*body* {i}")
+        serial = os.path.join(self.tmp.name, "serial")
+        generate_pages_recursive(self.content, self.template, serial)
+        generate_pages_recursive(self.content, self.template, self.public, jobs=4)
+
+        for from_path, dest_path in find_pages(self.content, self.public):
+            relative = os.path.relpath(dest_path, self.public)
+            self.assertEqual(read_file(os.path.join(dest_path, "index.html")),
+                             read_file(os.path.join(serial, relative, "index.html")))
+
+    def test_worker_inline_cache_lookups_are_counted(self):
+        for i in range(20):
+            write_file(os.path.join(self.content, "posts", f"p{i}", "index.md"), f"# Post {i}\n\n[Home](/)")
+        conversion.clear_inline_cache()
+        self.addCleanup(conversion.clear_inline_cache)
+        generate_pages_recursive(self.content, self.template, self.public, jobs=4)
+
+        stats = conversion.inline_cache_stats()
+        self.assertEqual(stats["hits"] + stats["misses"], 44)
+        self.assertGreater(stats["hits"], 0)
+
+    def test_reports_failing_pages(self):
+        write_file(os.path.join(self.content, "broken", "index.md"), "no title here")
+        pages = find_pages(self.content, self.public)
+
+        with self.assertRaises(Exception) as context:
+            generate_pages(pages, self.template, jobs=2, chunk_size=1)
+
+        self.assertIn("1 of 3 pages failed", str(context.exception))
+        self.assertTrue(os.path.exists(self.output("blog")))
+
+
+class PipelinedBuild(SiteTestCase):
+    def test_matches_serial_output_byte_for_byte(self):
+        for i in range(30):
+            write_file(os.path.join(self.content, "posts", f"p{i}", "index.md"), f"# Post {i}\n\n* item {i}")
+        write_file(os.path.join(self.content, "posts", "index.md"), "# Posts")
+        write_file(os.path.join(self.content, "posts", "z.md"), "# Posts again")
+        serial = os.path.join(self.tmp.name, "serial")
+        generate_pages_recursive(self.content, self.template, serial)
+        generate_pages_recursive(self.content, self.template, self.public, pipelined=True)
+
+        for from_path, dest_path in find_pages(self.content, self.public):
+            relative = os.path.relpath(dest_path, self.public)
+            with open(os.path.join(dest_path, "index.html"), "rb") as file:
+                pipelined = file.read()
+            with open(os.path.join(serial, relative, "index.html"), "rb") as file:
+                self.assertEqual(pipelined, file.read())
+        self.assertIn("Posts again", read_file(self.output("posts")))
+
+    def test_reports_failing_pages(self):
+        write_file(os.path.join(self.content, "broken", "index.md"), "no title here")
+        with self.assertRaises(Exception) as context:
+            generate_pages_recursive(self.content, self.template, self.public, pipelined=True)
+        self.assertIn("1 of 3 pages failed", str(context.exception))
+        self.assertTrue(os.path.exists(self.output("blog")))
+
+    def test_large_pages_are_streamed(self):
+        with mock.patch.object(build, "stream_threshold", 0):
+            generate_pages_recursive(self.content, self.template, self.public, pipelined=True)
+        self.assertIn("<h1>Home</h1>", read_file(self.output()))
+
+    def test_streamed_page_still_wins_its_directory(self):
+        write_file(os.path.join(self.content, "dup", "a.md"), "# Small")
+        write_file(os.path.join(self.content, "dup", "b.md"), "# Big\n\n" + "text " * 100)
+        with mock.patch.object(build, "stream_threshold", 100):
+            generate_pages_recursive(self.content, self.template, self.public, pipelined=True)
+        self.assertIn("<title>Big</title>", read_file(self.output("dup")))
+
+    def test_parse_cache_is_used_from_one_thread(self):
+        self.addCleanup(setattr, cache, "cache_settings", None)
+        self.addCleanup(cache.close_cache)
+        cache.enable_cache(os.path.join(self.tmp.name, ".build", "parse_cache.sqlite"), 1 << 20)
+        for i in range(10):
+            write_file(os.path.join(self.content, "posts", f"p{i}", "index.md"), f"# Post {i}")
+        generate_pages_recursive(self.content, self.template, self.public, pipelined=True)
+        first = read_file(self.output("posts", "p3"))
+
+        with mock.patch("build.markdown_to_html_node") as parse:
+            generate_pages_recursive(self.content, self.template, self.public, pipelined=True)
+            parse.assert_not_called()
+        self.assertEqual(read_file(self.output("posts", "p3")), first)
+        self.assertEqual(cache.active_cache().hits, 12)
+
+
+class StreamedBuild(SiteTestCase):
+    def test_large_pages_are_streamed(self):
+        write_file(os.path.join(self.content, "index.md"), "Intro *text*\n\n# Home\n\n```\ncode\n```")
+        generate_pages_recursive(self.content, self.template, self.public)
+        expected = read_file(self.output())
+
+        with mock.patch.object(build, "stream_threshold", 0):
+            with mock.patch("build.markdown_to_html_node") as parse:
+                generate_pages_recursive(self.content, self.template, self.public)
+                parse.assert_not_called()
+        self.assertEqual(read_file(self.output()), expected)
+
+
+class FrontMatterBuild(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        write_file(os.path.join(self.content, "index.md"),
+                   "---\ntitle: Welcome home\n---\n# Home\n\nWelcome")
+        write_file(os.path.join(self.content, "draft", "index.md"), "+++\ndraft = true\n+++\n# Draft")
+        self.addCleanup(build.set_include_drafts, True)
+
+    def test_front_matter_is_stripped_and_title_used(self):
+        expected = "<title>Welcome home</title><body><div><h1>Home</h1><p>Welcome</p></div></body>"
+        for pipelined in (False, True):
+            generate_pages_recursive(self.content, self.template, self.public, pipelined=pipelined)
+            self.assertEqual(read_file(self.output()), expected)
+        with mock.patch.object(build, "stream_threshold", 0):
+            generate_pages_recursive(self.content, self.template, self.public)
+        self.assertEqual(read_file(self.output()), expected)
+
+    def test_drafts_are_filtered_from_the_header(self):
+        build.set_include_drafts(False)
+        with mock.patch("build.markdown_to_html_node", wraps=build.markdown_to_html_node) as parse:
+            generate_pages_recursive(self.content, self.template, self.public)
+        self.assertEqual(parse.call_count, 2)
+        self.assertFalse(os.path.exists(self.output("draft")))
+
+        build.set_include_drafts(True)
+        incremental_build(self.content, self.template, self.public, self.manifest)
+        self.assertIn("<title>Draft</title>", read_file(self.output("draft")))
+        build.set_include_drafts(False)
+        incremental_build(self.content, self.template, self.public, self.manifest)
+        self.assertFalse(os.path.exists(self.output("draft")))
+
+
+class CachedBuild(SiteTestCase):
+    def test_unchanged_pages_skip_parsing(self):
+        self.addCleanup(setattr, cache, "cache_settings", None)
+        self.addCleanup(cache.close_cache)
+        cache.enable_cache(os.path.join(self.tmp.name, ".build", "parse_cache.sqlite"), 1 << 20)
+        generate_pages_recursive(self.content, self.template, self.public)
+        first = read_file(self.output())
+
+        with mock.patch("build.markdown_to_html_node") as parse:
+            generate_pages_recursive(self.content, self.template, self.public)
+            parse.assert_not_called()
+        self.assertEqual(read_file(self.output()), first)
+
+    def test_worker_hits_are_reported(self):
+        self.addCleanup(setattr, cache, "cache_settings", None)
+        cache.enable_cache(os.path.join(self.tmp.name, ".build", "parse_cache.sqlite"), 1 << 20)
+        for i in range(6):
+            write_file(os.path.join(self.content, "posts", f"p{i}", "index.md"), f"# Post {i}")
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            for _ in range(2):
+                generate_pages_recursive(self.content, self.template, self.public, jobs=2)
+                cache.close_cache()
+        self.assertIn("Parse cache: 0 hits, 8 misses", out.getvalue())
+        self.assertIn("Parse cache: 8 hits, 0 misses", out.getvalue())
+
+    def test_workers_receive_cache_settings(self):
+        self.addCleanup(setattr, cache, "cache_settings", None)
+        settings = (os.path.join(self.tmp.name, "parse_cache.sqlite"), 1 << 20)
+        build.init_worker(settings, None)
+        self.assertEqual(cache.parse_cache_settings(), settings)
+
+
+class IncrementalBuild(SiteTestCase):
+    def test_first_build_generates_everything(self):
+        incremental_build(self.content, self.template, self.public, self.manifest)
+        self.assertTrue(os.path.exists(self.output()))
+        self.assertTrue(os.path.exists(self.output("blog")))
+        self.assertEqual(len(load_manifest(self.manifest)["pages"]), 2)
+
+    def test_only_changed_pages_are_regenerated(self):
+        incremental_build(self.content, self.template, self.public, self.manifest)
+        write_file(self.output("blog"), "untouched")
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\nChanged")
+
+        incremental_build(self.content, self.template, self.public, self.manifest)
+        self.assertIn("Changed", read_file(self.output()))
+        self.assertEqual(read_file(self.output("blog")), "untouched")
+
+    def test_template_change_regenerates_everything(self):
+        incremental_build(self.content, self.template, self.public, self.manifest)
+        write_file(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+
+        incremental_build(self.content, self.template, self.public, self.manifest)
+        self.assertTrue(read_file(self.output()).startswith("<h1>Home</h1>"))
+        self.assertTrue(read_file(self.output("blog")).startswith("<h1>Blog</h1>"))
+
+    def test_removed_source_deletes_output(self):
+        incremental_build(self.content, self.template, self.public, self.manifest)
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+
+        incremental_build(self.content, self.template, self.public, self.manifest)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+        self.assertTrue(os.path.exists(self.output()))
+
+    def test_asset_change_rebuilds_dependent_pages(self):
+        static = os.path.join(self.tmp.name, "static")
+        write_file(os.path.join(static, "images", "logo.png"), "png")
+        write_file(os.path.join(self.content, "blog", "index.md"), "# Blog\n\n![logo](/images/logo.png)")
+        incremental_build(self.content, self.template, self.public, self.manifest, static_dir=static)
+        write_file(self.output(), "untouched")
+        write_file(self.output("blog"), "untouched")
+
+        write_file(os.path.join(static, "images", "logo.png"), "new png")
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            incremental_build(self.content, self.template, self.public, self.manifest,
+                              static_dir=static, explain=True)
+
+        self.assertEqual(read_file(self.output()), "untouched")
+        self.assertNotEqual(read_file(self.output("blog")), "untouched")
+        logo = os.path.normpath(os.path.join(static, "images", "logo.png"))
+        self.assertIn(f"Rebuilding {os.path.join(self.content, 'blog', 'index.md')}: {logo} changed",
+                      out.getvalue())
+
+    def test_explain_reasons(self):
+        incremental_build(self.content, self.template, self.public, self.manifest)
+        write_file(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\nChanged")
+        os.remove(self.output("blog"))
+
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            incremental_build(self.content, self.template, self.public, self.manifest, explain=True)
+        self.assertIn(f"Rebuilding {os.path.join(self.content, 'index.md')}: source changed; "
+                      f"{self.template} changed", out.getvalue())
+        self.assertIn(f"Rebuilding {os.path.join(self.content, 'blog', 'index.md')}: "
+                      f"{self.template} changed; output missing", out.getvalue())
+
+    def test_new_asset_map_rebuilds_everything(self):
+        incremental_build(self.content, self.template, self.public, self.manifest)
+        fingerprint.enable_fingerprints({"/index.css": "/index.0123456789.css"})
+        self.addCleanup(fingerprint.disable_fingerprints)
+
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            incremental_build(self.content, self.template, self.public, self.manifest, explain=True)
+        self.assertIn(f"Rebuilding {os.path.join(self.content, 'index.md')}: asset fingerprints changed",
+                      out.getvalue())
+        self.assertIn("2 generated", out.getvalue())
+
+    def test_pages_sharing_a_target_are_rebuilt_together(self):
+        write_file(os.path.join(self.content, "dup", "index.md"), "# First")
+        write_file(os.path.join(self.content, "dup", "z.md"), "# Second")
+        incremental_build(self.content, self.template, self.public, self.manifest)
+        self.assertIn("Second", read_file(self.output("dup")))
+
+        write_file(os.path.join(self.content, "dup", "index.md"), "# First edited")
+        incremental_build(self.content, self.template, self.public, self.manifest)
+        self.assertIn("Second", read_file(self.output("dup")))
+
+        os.remove(os.path.join(self.content, "dup", "z.md"))
+        incremental_build(self.content, self.template, self.public, self.manifest)
+        self.assertIn("First edited", read_file(self.output("dup")))
+
+    def test_dependencies_are_read_line_by_line(self):
+        static = os.path.join(self.tmp.name, "static")
+        path = os.path.join(self.content, "index.md")
+        write_file(path, "# Home\n\n![a](/a.png) and ![b](/img/b.png?v=2)\n\n![remote](https://x/c.png)\n")
+        self.assertEqual(build.page_dependencies(path, self.template, static),
+                         sorted([self.template, os.path.join(static, "a.png"),
+                                 os.path.join(static, "img", "b.png")]))
+
+    def test_new_converter_version_rebuilds_everything(self):
+        generate_pages_recursive(self.content, self.template, self.public)
+        write_manifest(self.content, self.template, self.public, self.manifest)
+        self.assertEqual(load_manifest(self.manifest)["converter"], conversion.converter_version)
+
+        out = io.StringIO()
+        with mock.patch("build.converter_version", "next"), contextlib.redirect_stdout(out):
+            incremental_build(self.content, self.template, self.public, self.manifest, explain=True)
+        self.assertIn(f"Rebuilding {os.path.join(self.content, 'index.md')}: converter version changed",
+                      out.getvalue())
+        self.assertIn("2 generated", out.getvalue())
+
+    def test_full_build_manifest_is_reused(self):
+        generate_pages_recursive(self.content, self.template, self.public)
+        write_manifest(self.content, self.template, self.public, self.manifest)
+        write_file(self.output("blog"), "untouched")
+
+        incremental_build(self.content, self.template, self.public, self.manifest)
+        self.assertEqual(read_file(self.output("blog")), "untouched")
+
+if __name__ == "__main__":
+    unittest.main()
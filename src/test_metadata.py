@@ -0,0 +1,84 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import metadata
+from build import find_pages
+from metadata import page_metadata, section_children, write_site_indexes
+from testutil import write_file, read_file
+
+
+class PageMetadata(unittest.TestCase):
+    def test_title_date_and_summary(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "index.md")
+            write_file(path, "---\ndate: 2024-03-01\n---\n# The **Hobbit**\n\n![map](/map.png)\n\n"
+                             "There and *back* [again](/again).\n\nMore")
+            self.assertEqual(page_metadata(path), {"title": "The **Hobbit**", "date": "2024-03-01",
+                                                   "summary": "There and back again."})
+
+    def test_front_matter_overrides_title(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "index.md")
+            write_file(path, "---\ntitle: Bilbo\nsummary: Short\ndate: never\n---\n# Heading")
+            self.assertEqual(page_metadata(path), {"title": "Bilbo", "date": None, "summary": "Short"})
+
+    def test_sections_without_pages(self):
+        entries = {"a": {"path": "/"}, "b": {"path": "/blog/2024/first/"}, "c": {"path": "/blog/about/"}}
+        sections = section_children(entries)
+        self.assertEqual(sorted(sections), ["/blog/", "/blog/2024/"])
+        self.assertEqual(sorted(entry["path"] for entry in sections["/blog/"]), ["/blog/2024/", "/blog/about/"])
+
+
+class SiteIndexes(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.content = os.path.join(self.tmp.name, "content")
+        self.public = os.path.join(self.tmp.name, "public")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        self.index = os.path.join(self.tmp.name, ".build", "metadata.json")
+        write_file(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        write_file(os.path.join(self.content, "blog", "one", "index.md"),
+                   "---\ndate: 2024-01-02\n---\n# One\n\nFirst post")
+        write_file(os.path.join(self.content, "blog", "two", "index.md"),
+                   "---\ndate: 2024-02-03\n---\n# Two\n\nSecond post")
+
+    def build(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            outputs = write_site_indexes(find_pages(self.content, self.public), self.template,
+                                         self.public, self.index, "https://example.com/")
+        return outputs, out.getvalue()
+
+    def test_sitemap_feed_and_sections(self):
+        outputs, _ = self.build()
+        self.assertEqual(len(outputs), 3)
+        sitemap = read_file(os.path.join(self.public, "sitemap.xml"))
+        self.assertIn("<url><loc>https://example.com/blog/one/</loc><lastmod>2024-01-02</lastmod></url>", sitemap)
+        rss = read_file(os.path.join(self.public, "rss.xml"))
+        self.assertIn("<title>Home</title>", rss)
+        self.assertLess(rss.index("<title>Two</title>"), rss.index("<title>One</title>"))
+        self.assertIn("Sat, 03 Feb 2024 00:00:00 +0000", rss)
+        section = read_file(os.path.join(self.public, "blog", "index.html"))
+        self.assertEqual(section, "<h1>blog</h1><div><ul>"
+                                  "<li><a href='/blog/two/'>Two</a> (2024-02-03)<p>Second post</p></li>"
+                                  "<li><a href='/blog/one/'>One</a> (2024-01-02)<p>First post</p></li>"
+                                  "</ul></div>")
+
+    def test_index_is_updated_incrementally(self):
+        self.build()
+        path = os.path.join(self.content, "blog", "two", "index.md")
+        write_file(path, "---\ndate: 2024-02-03\n---\n# Two again\n\nSecond post")
+        with mock.patch("metadata.page_metadata", wraps=metadata.page_metadata) as scan:
+            _, out = self.build()
+        scan.assert_called_once_with(path)
+        self.assertIn("1 pages scanned, 2 unchanged", out)
+        self.assertIn("Two again", read_file(os.path.join(self.public, "rss.xml")))
+
+if __name__ == "__main__":
+    unittest.main()
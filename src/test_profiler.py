@@ -0,0 +1,50 @@
+import json
+import os
+import tempfile
+import unittest
+
+import profiler
+from conversion import markdown_to_html_node
+from profiler import phase, page_phase, start_profiling, stop_profiling
+
+
+class ProfilerTests(unittest.TestCase):
+    def tearDown(self):
+        stop_profiling()
+
+    def test_disabled_by_default(self):
+        self.assertIs(phase("read"), profiler.null_phase)
+        with page_phase("page.md"):
+            markdown_to_html_node("# Title")
+
+    def test_phases_pages_and_block_types(self):
+        prof = start_profiling()
+        with page_phase("a.md"):
+            markdown_to_html_node("# Title\n\nSome *text*\n\n* one\n* two")
+        with page_phase("b.md"):
+            with phase("read"):
+                pass
+
+        result = prof.to_dict()
+        self.assertEqual(result["phases"]["markdown_to_blocks"]["count"], 1)
+        self.assertEqual(result["phases"]["block typing"]["count"], 3)
+        self.assertEqual(result["phases"]["inline parsing"]["count"], 4)
+        self.assertEqual(result["block_types"]["unordered"]["count"], 1)
+        self.assertIn("inline parsing", result["pages"]["a.md"]["phases"])
+        self.assertEqual(list(result["pages"]["b.md"]["phases"]), ["read"])
+        self.assertEqual([path for _, path in prof.slowest_pages(1)], ["a.md"])
+
+    def test_save_and_report(self):
+        prof = start_profiling()
+        with page_phase("a.md"):
+            with phase("write"):
+                pass
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "out", "profile.json")
+            prof.save(path)
+            with open(path) as file:
+                self.assertIn("a.md", json.load(file)["pages"])
+        self.assertIn("Top 5 slowest pages:", prof.report(5))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import search
+from search import build_shards, page_terms, term_shard, write_search_index
+from testutil import write_file
+
+
+def read_json(path):
+    with open(path, "r") as file:
+        return json.load(file)
+
+
+class PageTerms(unittest.TestCase):
+    def test_terms_come_from_text_not_markup(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "index.md")
+            write_file(path, "# The Hobbit\n\nA **bold** [link](/hobbit) and ![alt](/x.png)\n\n"
+                             "* one item\n* two item\n\n> quoted text")
+            result = page_terms(path)
+        self.assertEqual(result["title"], "The Hobbit")
+        self.assertEqual(result["terms"]["item"], 2)
+        self.assertEqual(result["terms"]["hobbit"], 1)
+        self.assertIn("quoted", result["terms"])
+        self.assertNotIn("png", result["terms"])
+
+    def test_shards_split_terms_stably(self):
+        entries = {f"p{i}.md": {"target": f"/public/p{i}", "title": f"P{i}",
+                                "terms": {f"term{i}": 1, "shared": 1}} for i in range(30)}
+        with mock.patch("search.shard_postings", 10):
+            index, shards = build_shards(entries, "/public")
+        self.assertEqual(index["shards"], 6)
+        self.assertEqual(shards[term_shard("shared", 6)]["shared"], [[i, 1] for i in range(30)])
+        self.assertEqual(index["documents"][0], ["/p0/", "P0"])
+
+
+class SearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.content = os.path.join(self.tmp.name, "content")
+        self.public = os.path.join(self.tmp.name, "public")
+        self.state = os.path.join(self.tmp.name, ".build", "search_state.json")
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\nWelcome home")
+        write_file(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nPosts")
+
+    def test_writes_index_and_shards(self):
+        outputs = write_search_index(self.content, self.public, self.state)
+        index = read_json(os.path.join(self.public, "search", "index.json"))
+        self.assertEqual(index["documents"], [["/blog/", "Blog"], ["/", "Home"]])
+        shard = read_json(os.path.join(self.public, "search", "shard-0.json"))
+        self.assertEqual(shard["home"], [[1, 2]])
+        self.assertEqual(len(outputs), 2)
+
+    def test_only_changed_pages_are_retokenized(self):
+        write_search_index(self.content, self.public, self.state)
+        write_file(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nNew posts")
+        with mock.patch("search.page_terms", wraps=search.page_terms) as terms:
+            write_search_index(self.content, self.public, self.state)
+        terms.assert_called_once_with(os.path.join(self.content, "blog", "index.md"))
+        self.assertIn("new", read_json(os.path.join(self.public, "search", "shard-0.json")))
+
+    def test_parallel_matches_serial(self):
+        for i in range(10):
+            write_file(os.path.join(self.content, "posts", f"p{i}", "index.md"), f"# Post {i}\n\nword{i}")
+        write_search_index(self.content, self.public, self.state)
+        serial = read_json(os.path.join(self.public, "search", "shard-0.json"))
+        os.remove(self.state)
+        write_search_index(self.content, self.public, self.state, jobs=2)
+        self.assertEqual(read_json(os.path.join(self.public, "search", "shard-0.json")), serial)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import gzip
+import http.client
+import os
+import tempfile
+import unittest
+
+from compress import compress_file
+from server import FileCache, start_server
+from testutil import write_file
+
+
+class FileCacheEviction(unittest.TestCase):
+    def test_least_recently_used_is_evicted(self):
+        with tempfile.TemporaryDirectory() as root:
+            paths = [os.path.join(root, name) for name in ("a", "b", "c")]
+            for path in paths:
+                write_file(path, "x" * 10)
+            cache = FileCache(25)
+            for path in paths[:2]:
+                cache.get(path, os.stat(path))
+            cache.get(paths[0], os.stat(paths[0]))
+            cache.get(paths[2], os.stat(paths[2]))
+
+            self.assertEqual(list(cache.entries), [paths[0], paths[2]])
+            self.assertEqual(cache.size, 20)
+            self.assertEqual(cache.hits, 1)
+
+    def test_changed_file_is_reloaded(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "a")
+            write_file(path, "old")
+            cache = FileCache(1024)
+            cache.get(path, os.stat(path))
+            write_file(path, "newer")
+            self.assertEqual(cache.get(path, os.stat(path)), b"newer")
+
+    def test_body_comes_from_the_open_file(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "a")
+            write_file(path, "old")
+            cache = FileCache(1024)
+            with open(path, "rb") as file:
+                stat = os.fstat(file.fileno())
+                write_file(path + ".tmp", "replaced")
+                os.replace(path + ".tmp", path)
+                self.assertEqual(cache.get(path, stat, file), b"old")
+            self.assertEqual(cache.get(path, os.stat(path)), b"replaced")
+
+
+class StaticServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.page = os.path.join(self.tmp.name, "blog", "index.html")
+        write_file(self.page, "<p>hello</p>" * 50)
+        write_file(os.path.join(self.tmp.name, "index.css"), "body {}")
+
+        self.server = start_server(self.tmp.name, 0, host="127.0.0.1")
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.connection = http.client.HTTPConnection("127.0.0.1", self.server.server_address[1])
+        self.addCleanup(self.connection.close)
+
+    def get(self, path, headers=None):
+        self.connection.request("GET", path, headers=headers or {})
+        response = self.connection.getresponse()
+        return response, response.read()
+
+    def test_serves_index_and_revalidates(self):
+        response, body = self.get("/blog/")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(body, b"<p>hello</p>" * 50)
+        self.assertEqual(response.getheader("Content-Type"), "text/html; charset=utf-8")
+        etag = response.getheader("ETag")
+        last_modified = response.getheader("Last-Modified")
+
+        #Same connection, so keep-alive held across requests
+        response, body = self.get("/blog/", {"If-None-Match": etag})
+        self.assertEqual((response.status, body), (304, b""))
+        response, body = self.get("/blog/", {"If-Modified-Since": last_modified})
+        self.assertEqual(response.status, 304)
+        self.assertEqual(self.server.cache.hits, 0)
+        self.get("/blog/")
+        self.assertEqual(self.server.cache.hits, 1)
+
+    def test_not_modified_repeats_cache_headers(self):
+        write_file(os.path.join(self.tmp.name, "index.0123456789.css"), "body {}")
+        for path in ("/blog/", "/index.0123456789.css"):
+            response, _ = self.get(path)
+            headers = [(name, response.getheader(name)) for name in ("Cache-Control", "Vary")]
+            response, _ = self.get(path, {"If-None-Match": response.getheader("ETag")})
+            self.assertEqual(response.status, 304)
+            self.assertEqual([(name, response.getheader(name)) for name in ("Cache-Control", "Vary")], headers)
+        self.assertEqual(headers[0], ("Cache-Control", "public, max-age=31536000, immutable"))
+
+    def test_redirects_and_missing_files(self):
+        response, _ = self.get("/blog")
+        self.assertEqual(response.status, 301)
+        self.assertEqual(response.getheader("Location"), "/blog/")
+        response, _ = self.get("/missing.css")
+        self.assertEqual(response.status, 404)
+        response, _ = self.get("/../../etc/passwd")
+        self.assertEqual(response.status, 404)
+
+    def test_precompressed_variant(self):
+        compress_file(self.page)
+        response, body = self.get("/blog/index.html", {"Accept-Encoding": "gzip"})
+        self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+        self.assertEqual(response.getheader("Vary"), "Accept-Encoding")
+        self.assertEqual(gzip.decompress(body), b"<p>hello</p>" * 50)
+
+        response, body = self.get("/blog/index.html", {"Accept-Encoding": "gzip;q=0"})
+        self.assertIsNone(response.getheader("Content-Encoding"))
+
+        #A rewritten page no longer matches its sibling, which is then ignored
+        write_file(self.page, "<p>new</p>")
+        os.utime(self.page, ns=(0, os.stat(self.page).st_mtime_ns + 1))
+        response, body = self.get("/blog/index.html", {"Accept-Encoding": "gzip"})
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertEqual(body, b"<p>new</p>")
+
+if __name__ == "__main__":
+    unittest.main()
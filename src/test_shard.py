@@ -0,0 +1,115 @@
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from build import find_pages, generate_pages
+from shard import finish_shard, find_shards, merge_shards, page_shard, parse_shard, shard_dir, shard_pages, \
+                  verify_shards
+from testutil import write_file, read_file
+
+
+class ParseShard(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for text in ("0/4", "5/4", "1/0", "a/b", "1"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_shard(text)
+
+
+class ShardedBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.content = os.path.join(self.tmp.name, "content")
+        self.shards = os.path.join(self.tmp.name, "shards")
+        self.public = os.path.join(self.tmp.name, "public")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        write_file(self.template, "{{ Title }}|{{ Content }}")
+        for i in range(12):
+            write_file(os.path.join(self.content, f"p{i}", "index.md"), f"# Post {i}")
+        write_file(os.path.join(self.content, "p0", "extra.md"), "# Extra")
+
+    def build_shards(self, count):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            for index in range(1, count + 1):
+                root = shard_dir(self.shards, index, count)
+                dest = os.path.join(root, "public")
+                pages = shard_pages(find_pages(self.content, dest), self.content, index, count)
+                generate_pages(pages, self.template)
+                finish_shard(root, index, count, pages, self.content, self.template)
+
+    def test_partition_is_stable_and_complete(self):
+        pages = find_pages(self.content, self.public)
+        slices = [shard_pages(pages, self.content, index, 3) for index in (1, 2, 3)]
+        self.assertEqual(sorted(page for pages in slices for page in pages), sorted(pages))
+        self.assertEqual(page_shard(os.path.join(self.content, "p0", "index.md"), self.content, 3),
+                         page_shard(os.path.join(self.content, "p0", "extra.md"), self.content, 3))
+        self.assertEqual(slices[0], shard_pages(pages, self.content, 1, 3))
+
+    def test_merge_matches_single_build(self):
+        self.build_shards(3)
+        single = os.path.join(self.tmp.name, "single")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages(find_pages(self.content, single), self.template)
+            counts, merged = merge_shards(find_shards(self.shards), self.public)
+        self.assertEqual(counts, {"written": 12, "skipped": 0})
+        for from_path, dest_path in find_pages(self.content, single):
+            relative = os.path.relpath(dest_path, single)
+            self.assertEqual(read_file(os.path.join(self.public, relative, "index.html")),
+                             read_file(os.path.join(dest_path, "index.html")))
+
+    def test_collisions_are_reported(self):
+        self.build_shards(2)
+        other = 3 - page_shard(os.path.join(self.content, "p0", "index.md"), self.content, 2)
+        write_file(os.path.join(shard_dir(self.shards, other, 2), "public", "p0", "index.html"), "stray")
+        with contextlib.redirect_stdout(io.StringIO()):
+            with self.assertRaisesRegex(Exception, "1 files collide across shards"):
+                merge_shards(find_shards(self.shards), self.public)
+        self.assertFalse(os.path.exists(self.public))
+
+    def test_static_files_collide_with_pages(self):
+        self.build_shards(1)
+        with contextlib.redirect_stdout(io.StringIO()):
+            with self.assertRaisesRegex(Exception, "collide"):
+                merge_shards(find_shards(self.shards), self.public, [os.path.join(self.public, "p1", "index.html")])
+
+    def verify(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            verify_shards(find_shards(self.shards), find_pages(self.content, self.public), self.content,
+                          self.template)
+        return out.getvalue()
+
+    def test_finished_shards_cover_every_page(self):
+        self.build_shards(3)
+        self.assertEqual(self.verify(), "")
+
+    def test_stale_shards_are_refused(self):
+        self.build_shards(2)
+        write_file(os.path.join(self.content, "p1", "index.md"), "# Post 1 edited")
+        write_file(os.path.join(self.content, "new", "index.md"), "# New")
+        os.remove(os.path.join(self.content, "p2", "index.md"))
+        with self.assertRaisesRegex(Exception, "3 problems with the shards"):
+            self.verify()
+
+        self.build_shards(2)
+        write_file(self.template, "<b>{{ Title }}</b>{{ Content }}")
+        with self.assertRaisesRegex(Exception, "2 problems with the shards"):
+            self.verify()
+
+    def test_unfinished_or_mixed_shards(self):
+        self.build_shards(2)
+        os.remove(os.path.join(shard_dir(self.shards, 2, 2), "shard.json"))
+        with self.assertRaisesRegex(Exception, "Shard 2/2 has not finished"):
+            find_shards(self.shards)
+        self.build_shards(3)
+        with self.assertRaisesRegex(Exception, "one build"):
+            find_shards(self.shards)
+        self.assertEqual(len(find_shards(self.shards, 3)), 3)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+
+from sync import files_match, prune_tree, sync_tree
+from testutil import write_file, read_file
+
+
+class SyncTree(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.static = os.path.join(self.tmp.name, "static")
+        self.public = os.path.join(self.tmp.name, "public")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        write_file(os.path.join(self.static, "images", "logo.png"), "png")
+
+    def test_copies_tree(self):
+        synced = sync_tree(self.static, self.public)
+        self.assertEqual(synced, {os.path.join(self.public, "index.css"),
+                                  os.path.join(self.public, "images", "logo.png")})
+        self.assertEqual(read_file(os.path.join(self.public, "images", "logo.png")), "png")
+        self.assertTrue(files_match(os.path.join(self.static, "index.css"),
+                                    os.path.join(self.public, "index.css")))
+
+    def test_unchanged_files_are_not_copied(self):
+        sync_tree(self.static, self.public)
+        dest = os.path.join(self.public, "index.css")
+        before = os.stat(dest).st_ino
+        write_file(os.path.join(self.static, "images", "logo.png"), "new png")
+
+        sync_tree(self.static, self.public)
+        self.assertEqual(os.stat(dest).st_ino, before)
+        self.assertEqual(read_file(os.path.join(self.public, "images", "logo.png")), "new png")
+
+    def test_checksum_detects_same_size_edit(self):
+        sync_tree(self.static, self.public)
+        dest = os.path.join(self.public, "index.css")
+        write_file(dest, "head {}")
+        stat = os.stat(os.path.join(self.static, "index.css"))
+        os.utime(dest, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        sync_tree(self.static, self.public)
+        self.assertEqual(read_file(dest), "head {}")
+        sync_tree(self.static, self.public, checksum=True)
+        self.assertEqual(read_file(dest), "body {}")
+
+    def test_hardlink(self):
+        sync_tree(self.static, self.public, hardlink=True)
+        self.assertTrue(os.path.samefile(os.path.join(self.static, "index.css"),
+                                         os.path.join(self.public, "index.css")))
+
+class PruneTree(unittest.TestCase):
+    def test_removes_files_not_kept(self):
+        with tempfile.TemporaryDirectory() as public:
+            keep = os.path.join(public, "index.html")
+            write_file(keep, "page")
+            write_file(os.path.join(public, "old", "index.html"), "stale")
+
+            self.assertEqual(prune_tree(public, [keep]), 1)
+            self.assertTrue(os.path.exists(keep))
+            self.assertFalse(os.path.exists(os.path.join(public, "old")))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from template import compile_template, load_template, render_template, write_template
+
+
+class CompileTemplate(unittest.TestCase):
+    def test_segments_and_slots(self):
+        compiled = compile_template("<title>{{ Title }}</title>{{Content}}!")
+        self.assertEqual(compiled, ["<title>", ("Title", "{{ Title }}"), "</title>",
+                                    ("Content", "{{Content}}"), "!"])
+
+    def test_no_placeholders(self):
+        self.assertEqual(compile_template("plain"), ["plain"])
+
+class RenderTemplate(unittest.TestCase):
+    def test_render(self):
+        compiled = compile_template("<h1>{{ Title }}</h1>{{ Content }}<p>{{ Title }}</p>")
+        html = render_template(compiled, {"Title": "Hi", "Content": "<p>body</p>"})
+        self.assertEqual(html, "<h1>Hi</h1><p>body</p><p>Hi</p>")
+
+    def test_unknown_placeholders_are_kept(self):
+        compiled = compile_template("{{ Title }} {{ Author }}")
+        self.assertEqual(render_template(compiled, {"Title": "Hi"}), "Hi {{ Author }}")
+
+    def test_write_streams_nodes(self):
+        compiled = compile_template("<title>{{ Title }}</title>{{ Content }}")
+        node = ParentNode([LeafNode("body", "b")], "div")
+        out = io.StringIO()
+        write_template(out, compiled, {"Title": "Hi", "Content": node})
+        self.assertEqual(out.getvalue(), "<title>Hi</title><div><b>body</b></div>")
+        self.assertEqual(render_template(compiled, {"Title": "Hi", "Content": node}), out.getvalue())
+
+class LoadTemplate(unittest.TestCase):
+    def test_cached_until_modified(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as file:
+                file.write("{{ Title }}")
+            first = load_template(path)
+            self.assertIs(load_template(path), first)
+
+            with open(path, "w") as file:
+                file.write("<b>{{ Title }}</b>")
+            future = time.time() + 10
+            os.utime(path, (future, future))
+            self.assertEqual(render_template(load_template(path), {"Title": "x"}), "<b>x</b>")
+
+if __name__ == "__main__":
+    unittest.main()
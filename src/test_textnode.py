@@ -26,5 +26,11 @@ class TestTextNode(unittest.TestCase):
         node3 = TextNode("This is a text node", "bold", "http://example.com")
         self.assertNotEqual(node, node3)
 
+    def test_slots(self):
+        node = TextNode("This is a text node", "bold")
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = True
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
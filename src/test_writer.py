@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+import unittest
+
+from writer import page_url, save_json, write_output
+
+
+class WriteOutput(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "index.html")
+
+    def test_writes_new_file(self):
+        self.assertEqual(write_output(self.path, lambda f: f.write("<p>hi</p>")), "written")
+        with open(self.path) as file:
+            self.assertEqual(file.read(), "<p>hi</p>")
+
+    def test_identical_output_is_skipped(self):
+        write_output(self.path, lambda f: f.write("<p>hi</p>"))
+        before = os.stat(self.path)
+        self.assertEqual(write_output(self.path, lambda f: f.write("<p>hi</p>")), "skipped")
+        after = os.stat(self.path)
+        self.assertEqual((after.st_ino, after.st_mtime_ns), (before.st_ino, before.st_mtime_ns))
+        self.assertEqual(os.listdir(self.tmp.name), ["index.html"])
+
+    def test_changed_output_replaces_file(self):
+        write_output(self.path, lambda f: f.write("<p>hi</p>"))
+        self.assertEqual(write_output(self.path, lambda f: f.write("<p>bye</p>")), "written")
+        with open(self.path) as file:
+            self.assertEqual(file.read(), "<p>bye</p>")
+
+    def test_failed_write_keeps_old_file(self):
+        write_output(self.path, lambda f: f.write("<p>hi</p>"))
+
+        def fail(file):
+            file.write("<p>half")
+            raise ValueError("render failed")
+
+        with self.assertRaises(ValueError):
+            write_output(self.path, fail)
+        with open(self.path) as file:
+            self.assertEqual(file.read(), "<p>hi</p>")
+        self.assertEqual(os.listdir(self.tmp.name), ["index.html"])
+
+
+class SaveJson(unittest.TestCase):
+    def test_creates_directory_and_round_trips(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "state", "manifest.json")
+            self.assertEqual(save_json(path, {"b": 1, "a": [2]}), "written")
+            self.assertEqual(save_json(path, {"a": [2], "b": 1}), "skipped")
+            with open(path) as file:
+                self.assertEqual(json.load(file), {"a": [2], "b": 1})
+            self.assertEqual(os.listdir(os.path.dirname(path)), ["manifest.json"])
+
+    def test_compact(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "index.json")
+            save_json(path, {"b": 1, "a": 2}, compact=True)
+            with open(path) as file:
+                self.assertEqual(file.read(), '{"a":2,"b":1}')
+
+
+class PageUrl(unittest.TestCase):
+    def test_urls(self):
+        self.assertEqual(page_url("public", "public"), "/")
+        self.assertEqual(page_url(os.path.join("public", "blog", "post"), "public"), "/blog/post/")
+        self.assertEqual(page_url(os.path.abspath(os.path.join("public", "a")), "public"), "/a/")
+
+
+if __name__ == "__main__":
+    unittest.main()
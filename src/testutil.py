@@ -0,0 +1,13 @@
+import os
+
+#File helpers shared by the test modules
+
+
+def write_file(path, contents):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(contents)
+
+def read_file(path):
+    with open(path, "r") as file:
+        return file.read()
@@ -0,0 +1,43 @@
+import json
+import os
+import uuid
+
+
+def same_contents(first_path, second_path):
+    if os.path.getsize(first_path) != os.path.getsize(second_path):
+        return False
+    with open(first_path, "rb") as first, open(second_path, "rb") as second:
+        while True:
+            first_chunk = first.read(1 << 16)
+            if first_chunk != second.read(1 << 16):
+                return False
+            if not first_chunk:
+                return True
+
+def write_output(path, write):
+    #write(file) fills a temp file next to path, which only replaces path if the bytes differ
+    directory, name = os.path.split(path)
+    temp_path = os.path.join(directory, f".{name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(temp_path, "x") as file:
+            write(file)
+        if os.path.isfile(path) and same_contents(temp_path, path):
+            os.remove(temp_path)
+            return "skipped"
+        os.replace(temp_path, path)
+        return "written"
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def save_json(path, data, compact=False):
+    #compact drops the indentation for files that grow with the site or are fetched by clients
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    options = {"separators": (",", ":")} if compact else {"indent": 1}
+    return write_output(path, lambda f: json.dump(data, f, sort_keys=True, **options))
+
+def page_url(target_path, dest_dir_path):
+    #The site URL of a page whose index.html is written to target_path
+    relative = os.path.relpath(target_path, dest_dir_path).replace(os.sep, "/")
+    return "/" if relative == "." else f"/{relative}/"